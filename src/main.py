@@ -31,7 +31,7 @@ gi.require_version("Gtk", "3.0")  # isort:skip
 gi.require_version("Notify", "0.7")  # isort:skip
 from gi.repository import Gtk  # noqa: F401, E402
 
-from yumex import YumexApplication  # noqa: E402
+from yumex.app import YumexApplication  # noqa: E402
 
 here = sys.path[0]
 if here != "/usr/bin":
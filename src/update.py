@@ -25,12 +25,10 @@ import traceback
 import subprocess
 import signal
 
-# We need this for else is Gtk 4.0 selected by default
+# The updater don't use Gtk, so it is not loaded
 import gi  # isort:skip
 
-gi.require_version("Gtk", "3.0")  # isort:skip
 gi.require_version("Notify", "0.7")  # isort:skip
-from gi.repository import Gtk  # noqa: F401, E402
 
 from yumex.updater import UpdateApplication  # noqa: E402
 
@@ -59,6 +59,16 @@ class Backend:
         pkgs = self.cache._get_packages(flt)  # pylint: disable=protected-access
         return pkgs
 
+    def get_update_set(self):
+        """Get the unfiltered set of cached updates and obsoletes
+
+        Return None if updates and obsoletes is not loaded yet
+        """
+        for flt in ("updates", "obsoletes"):
+            if not self.cache.is_populated(flt):
+                return None
+        return self.cache.updates | self.cache.obsoletes  # pylint: disable=no-member
+
 
 class BaseFilter:
     """Used as base for filters, there can filter a list of packages
@@ -159,6 +169,36 @@ class PackageCache:
         pkgs = list(getattr(self, str(pkg_filter)))
         return pkgs
 
+    def get(self, fullname):
+        """
+        get a cached package by its full name
+        @param fullname: package full name (n-e:v-r.a)
+        """
+        return self._index.get(fullname)
+
+    def remove(self, po):
+        """
+        remove a package from the cache
+        @param po: package to remove
+        """
+        for flt in const.ACTIONS_FILTER.values():
+            getattr(self, flt).discard(po)
+        if self._index.get(str(po)) is po:
+            del self._index[str(po)]
+
+    def invalidate(self, pkg_filter):
+        """
+        remove all packages of a given type from the cache,
+        so they will be fetched again, next time they are needed
+        @param pkg_filter: the type of packages to invalidate
+        """
+        for po in getattr(self, pkg_filter):
+            if self._index.get(str(po)) is po:
+                del self._index[str(po)]
+        setattr(self, pkg_filter, set())
+        if pkg_filter in self._populated:
+            self._populated.remove(pkg_filter)
+
     def is_populated(self, pkg_filter):
         return str(pkg_filter) in self._populated
 
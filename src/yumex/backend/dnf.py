@@ -24,6 +24,8 @@ from gi.repository import Gdk
 
 import yumex.common.const as const
 from yumex.backend import Backend
+from yumex.common.cache import ATTRIBUTE_CACHE_FILE, AttributeCache, get_cache_file
+from yumex.common.markers import get_markers, load_updates
 from yumex.common import (
     CONFIG,
     exception_handler,
@@ -77,7 +79,18 @@ class DnfPackage:
     @exception_handler
     def get_attribute(self, attr):
         """Get a given attribute for a package."""
-        return self.backend.GetAttribute(self.pkg_id, attr)
+        # a local rpm file can be changed, so it is not cached
+        cached = attr in const.CACHED_ATTRIBUTES and self.action != "li"
+        if cached:
+            value = self.backend.attr_cache.get(self.pkg_id, attr)
+            if value is not None:
+                return value
+        if self.backend.transaction_running:  # the daemon is busy
+            return None
+        value = self.backend.GetAttribute(self.pkg_id, attr)
+        if cached:
+            self.backend.attr_cache.put(self.pkg_id, attr, value)
+        return value
 
     @property
     def filename(self):
@@ -180,6 +193,19 @@ class DnfRootBackend(Backend, dnfdaemon.client.Client):
         self._files_downloaded = 0
         self._current_download = None
         self._dnl_packages = None
+        # number of repos to refresh and refreshed, for the metadata progress
+        self._repos_to_refresh = 0
+        self._repos_refreshed = 0
+        # (queue fingerprint, result) of the last resolved transaction
+        self._resolved = None
+        # bumped every time the transaction in the daemon is changed
+        self._resolved_generation = 0
+        # the daemon is busy running a transaction, only use cached data
+        self.transaction_running = False
+        self.attr_cache = AttributeCache(
+            get_cache_file(ATTRIBUTE_CACHE_FILE),
+            CONFIG.conf.attribute_cache_size * 1024 * 1024,
+        )
         if self.running_api_version == const.NEEDED_DAEMON_API:
             logger.debug(f"dnfdaemon api version ({self.running_api_version})")
         else:
@@ -283,10 +309,20 @@ class DnfRootBackend(Backend, dnfdaemon.client.Client):
         values = (name, frac)
         logger.debug(f"on_RepoMetaDataProgress (root): {repr(values)}")
         if frac == 0.0:
-            self.frontend.infobar.message_sub(name)
+            if self._repos_refreshed < self._repos_to_refresh:
+                self._repos_refreshed += 1
+                num = f"( {self._repos_refreshed}/{self._repos_to_refresh} )"
+                self.frontend.infobar.message_sub(f"{name} {num}")
+            else:
+                self.frontend.infobar.message_sub(name)
         else:
             self.frontend.infobar.set_progress(frac)
 
+    def set_repos_to_refresh(self, num_repos):
+        """Set the number of repos there is going to be refreshed."""
+        self._repos_to_refresh = num_repos
+        self._repos_refreshed = 0
+
     def setup(self):
         """Setup the dnf backend daemon."""
         try:
@@ -306,14 +342,136 @@ class DnfRootBackend(Backend, dnfdaemon.client.Client):
         self.Exit()
 
     @exception_handler
-    def reload(self):
-        """Reload the dnf backend daemon."""
+    def reload(self, transaction=None):
+        """Reload the dnf backend daemon.
+
+        :param transaction: result of a completed transaction (GetTransaction),
+                            if given, the changes is applied to the package cache
+                            else the cache is reset.
+        """
         self.Unlock()  # Release the lock
         # time.sleep(5)
         self.Lock()  # Load & Lock the daemon
         self.SetWatchdogState(False)
         # self._update_config_options()
-        self.cache.reset()  # Reset the cache
+        if transaction is None:
+            self.cache.reset()  # Reset the cache
+        else:
+            self._update_cache(transaction)
+        self.clear_resolved()
+
+    @timer
+    def _update_cache(self, transaction):
+        """Apply the changes from a completed transaction to the package cache.
+
+        Only the package types there can be affected by the changes, is
+        fetched again from the daemon.
+
+        :param transaction: list of (action, [(pkg_id, size, replaces), ...])
+        """
+        installed = []
+        removed = []
+        downgraded = False
+        for action, pkgs in transaction:
+            for pkg_id, _size, replaces in pkgs:
+                if action in ("remove", "erase"):
+                    removed.append(pkg_id)
+                else:
+                    installed.append(pkg_id)
+                removed.extend(replaces)
+            if action == "downgrade":
+                downgraded = True
+        logger.debug(f"cache update: {len(installed)} installed {len(removed)} removed")
+        names = set()
+        for pkg_id in removed:
+            (n, _, _, _, a, _) = to_pkg_tuple(pkg_id)
+            names.add((n, a))
+            po = self.cache.get(pkg_id_to_full_name(pkg_id))
+            if po:
+                self.cache.remove(po)
+        # updates for removed packages is no longer valid
+        # pylint: disable=no-member
+        for po in list(self.cache.updates | self.cache.obsoletes):
+            if (po.name, po.arch) in names:
+                self.cache.remove(po)
+        if self.cache.is_populated("installed"):
+            self._add_installed(installed)
+        else:
+            # the installed packages is fetched, when they are needed
+            for pkg_id in installed:
+                po = self.cache.get(pkg_id_to_full_name(pkg_id))
+                if po:
+                    self.cache.remove(po)
+            self.cache.invalidate("installed")
+        # removed packages can be available again
+        if removed:
+            self.cache.invalidate("available")
+        # downgraded packages will have updates
+        if downgraded:
+            self.cache.invalidate("updates")
+            self.cache.invalidate("obsoletes")
+
+    def _add_installed(self, pkg_ids):
+        """Add the packages installed by a transaction to the package cache.
+
+        The summary & size is taken from the available package objects, the
+        packages not in the cache is fetched with a single daemon call.
+
+        :param pkg_ids: pkg_ids of the installed packages
+        """
+        new_pkgs = []
+        missing = []
+        for pkg_id in pkg_ids:
+            po = self.cache.get(pkg_id_to_full_name(pkg_id))
+            if po:  # the available/update package is now installed
+                (n, e, v, r, a, repo_id) = to_pkg_tuple(pkg_id)
+                if not repo_id.startswith("@"):
+                    repo_id = f"@{repo_id}"
+                inst_id = ",".join((n, e, v, r, a, repo_id))
+                new_pkgs.append(DnfPackage((inst_id, po.summary, po.size), "r", self))
+                self.cache.remove(po)
+            else:
+                missing.append(pkg_id_to_full_name(pkg_id))
+        if missing:
+            logger.debug(f"cache update: fetching {len(missing)} installed packages")
+            missing = set(missing)
+            for pkg in self.GetPackages("installed", ["summary", "size"]):
+                if pkg_id_to_full_name(pkg[0]) in missing:
+                    new_pkgs.append(DnfPackage(pkg, "r", self))
+        self.cache.find_packages(new_pkgs)
+
+    def get_resolved(self, fingerprint):
+        """Get the last resolved transaction, if it was resolved from a
+        queue with the same fingerprint, else return None
+        """
+        if self._resolved and self._resolved[0] == fingerprint:
+            return self._resolved[1]
+        return None
+
+    def set_resolved(self, fingerprint, result, generation=None):
+        """Remember the resolved transaction for a queue fingerprint.
+
+        :param generation: resolved_generation from before the transaction
+                           was resolved, the result is not used if the
+                           transaction in the daemon has changed since.
+        """
+        if generation is not None and generation != self._resolved_generation:
+            logger.debug("resolved transaction is outdated, not used")
+            return
+        self._resolved = (fingerprint, result)
+
+    @property
+    def resolved_generation(self):
+        """Changed every time the transaction in the daemon is changed."""
+        return self._resolved_generation
+
+    def clear_resolved(self):
+        """Forget the last resolved transaction.
+
+        Must be called when the transaction in the daemon is changed
+        """
+        self._resolved = None
+        self._resolved_generation += 1
 
     def _update_config_options(self):
         if CONFIG.session.clean_instonly:
@@ -394,8 +552,18 @@ class DnfRootBackend(Backend, dnfdaemon.client.Client):
         for pkg_flt in filters:
             # is this type of packages is already cached ?
             if not self.cache.is_populated(pkg_flt):
+                if self.transaction_running:
+                    logger.debug(f"daemon is busy, {pkg_flt} is not loaded")
+                    continue
                 fields = ["summary", "size"]  # fields to get
-                po_list = self.GetPackages(pkg_flt, fields)
+                po_list = None
+                # the updater has just found the updates with the default repos
+                if pkg_flt == "updates" and not CONFIG.session.enabled_repos:
+                    po_list = load_updates(get_markers())
+                    if po_list is not None:
+                        logger.debug("using the updates found by the updater")
+                if po_list is None:
+                    po_list = self.GetPackages(pkg_flt, fields)
                 if pkg_flt == "updates_all":
                     pkg_flt = "updates"
                 pkgs = self._make_pkg_object(po_list, pkg_flt)
@@ -407,6 +575,8 @@ class DnfRootBackend(Backend, dnfdaemon.client.Client):
     @exception_handler
     def get_downgrades(self, pkg_id):
         """Get downgrades for a given pkg_id"""
+        if self.transaction_running:
+            return []
         pkgs = self.GetAttribute(pkg_id, "downgrades")
         return self._build_package_list(pkgs)
 
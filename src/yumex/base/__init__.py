@@ -20,11 +20,13 @@
 import datetime
 import logging
 import sys
+import time
 
 import yumex.common.const as const
 import yumex.common as common
 
 from yumex.common import CONFIG, _
+from yumex.common.markers import get_repo_markers
 
 from yumex.backend.dnf import DnfRootBackend
 from yumex.gui.dialogs import show_information
@@ -37,6 +39,8 @@ class BaseYumex:
         self._root_backend = None
         self._root_locked = False
         self.is_working = False
+        # a transaction is running in the background
+        self.transaction_running = False
         self.infobar = None
 
     def set_working(self, state, insensitive=True, splash=False):
@@ -65,6 +69,44 @@ class BaseYumex:
             logger.debug(f"time since last cache refresh : {period}")
             return period > refresh_period
 
+    def _get_expired_repos(self):
+        """Get the enabled repos, with metadata older than their
+        metadata_expire.
+
+        The metadata age is taken from the repomd.xml in the dnf cache, if
+        the dnf cache can't be read, all enabled repos are expired, when the
+        last system refresh is older than refresh_interval.
+        Repos without cached metadata is not expired, dnf will download the
+        metadata anyway.
+        """
+        if CONFIG.conf.refresh_interval == 0:
+            return []
+        repos = self._root_backend.get_repo_ids("enabled")
+        markers = get_repo_markers()
+        if not markers:
+            return repos if self._check_cache_expired("system") else []
+        now = time.time()
+        expired = []
+        for repo_id in repos:
+            if not markers.get(repo_id):
+                continue
+            expire = self._get_metadata_expire(repo_id)
+            if expire >= 0 and now - markers[repo_id] > expire:
+                expired.append(repo_id)
+        logger.debug(f"repos with expired metadata : {expired}")
+        return expired
+
+    def _get_metadata_expire(self, repo_id):
+        """Get the metadata_expire (seconds, -1 = never) for a repo.
+
+        refresh_interval is used, if the daemon don't have it for the repo
+        """
+        repo = self._root_backend.GetRepo(repo_id)
+        expire = repo.get("metadata_expire") if isinstance(repo, dict) else None
+        if isinstance(expire, (int, float)) and not isinstance(expire, bool):
+            return expire
+        return CONFIG.conf.refresh_interval * 3600
+
     def _set_cache_refreshed(self, cache_type):
         time_fmt = "%Y-%m-%d %H:%M"
         now = datetime.datetime.now()
@@ -81,11 +123,35 @@ class BaseYumex:
         return self.get_root_backend()
 
     @common.exception_handler
-    def reset_cache(self):
-        logger.debug("Refresh system cache")
+    def reset_cache(self, repos=None):
+        """Refresh the repository metadata.
+
+        :param repos: repo ids to refresh, None to refresh all enabled repos
+        """
+        logger.debug(f"Refresh system cache : {repos or 'all repos'}")
         self.set_working(True, True, splash=True)
         self.infobar.message(_("Refreshing Repository Metadata"))
-        rc = self._root_backend.ExpireCache()
+        self._root_backend.clear_resolved()
+        enabled = self._root_backend.get_repo_ids("enabled")
+        if repos is None:
+            repos = enabled
+        if (
+            set(repos) < set(enabled)
+            and len(repos) <= len(enabled) * const.PARTIAL_REFRESH_LIMIT
+        ):
+            # the daemon only expires the enabled repos, so only the repos to
+            # refresh is enabled while expiring.
+            self._root_backend.set_repos_to_refresh(len(repos))
+            try:
+                self._root_backend.SetEnabledRepos(repos)
+                rc = self._root_backend.ExpireCache()
+            finally:
+                self._root_backend.SetEnabledRepos(enabled)
+        else:
+            self._root_backend.set_repos_to_refresh(len(enabled))
+            rc = self._root_backend.ExpireCache()
+        # the packages must be fetched again from the refreshed metadata
+        self._root_backend.cache.reset()
         self.set_working(False, splash=True)
         if rc:
             self._set_cache_refreshed("system")
@@ -107,9 +173,10 @@ class BaseYumex:
             errmsg = ""
             if locked:
                 self._root_locked = True
-                if self._check_cache_expired("system"):
+                expired = self._get_expired_repos()
+                if expired:
                     logger.debug("cache is expired, reloading")
-                    self.reset_cache()
+                    self.reset_cache(expired)
             else:
                 logger.critical("can't get root backend lock")
                 if msg == "not-authorized":  # user canceled the polkit dialog
@@ -139,6 +206,21 @@ class BaseYumex:
             logger.debug("Exit the DNF root daemon")
             self._root_backend.Exit()
 
+    @common.exception_handler
+    def close_root_backend(self):
+        """Release the root backend, when yumex is closed.
+
+        If daemon_keepalive is set and the updater is running, the daemon is
+        kept running, so it don't have to be started again, and the updater
+        closes it after daemon_keepalive minutes, else the daemon is closed.
+        """
+        if CONFIG.conf.daemon_keepalive > 0 and self._root_backend is not None:
+            self.release_root_backend()
+            if common.updater_action("daemon-released"):
+                logger.debug("Keeping the DNF root daemon running")
+                return
+        self.release_root_backend(quit_dnfdaemon=True)
+
     def exception_handler(self, e):
         """Called if exception occours in methods with the
         @ExceptionHandler decorator.
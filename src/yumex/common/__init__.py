@@ -30,9 +30,13 @@ import time
 import dnfdaemon.client
 import yumex.common.config as config
 
-from gi.repository import Gdk, Gtk, Notify
+# NOTE: this module is used by the updater too, so don't import Gtk here,
+# the Gtk utilities is in yumex.gui
 
 LOCALE_DIR = os.path.join(sys.prefix, "share", "locale")
+# D-Bus name & object path of the updater (Gio.Application)
+UPDATER_APP_ID = "dk.yumex.yumex-updater"
+UPDATER_OBJECT_PATH = "/dk/yumex/yumex_updater"
 locale.setlocale(locale.LC_ALL, "")
 locale.bindtextdomain("yumex-dnf", LOCALE_DIR)
 gettext.bindtextdomain("yumex-dnf", LOCALE_DIR)
@@ -73,6 +77,32 @@ def dbus_dnfsystem(cmd):
     print(f' Executed : {" ".join(rc.args)}')
 
 
+def updater_action(action):
+    """Activate an action in the running updater
+
+    returns False, if the updater is not running
+    """
+    from gi.repository import Gio, GLib  # pylint: disable=import-outside-toplevel
+
+    try:
+        bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        bus.call_sync(
+            UPDATER_APP_ID,
+            UPDATER_OBJECT_PATH,
+            "org.gtk.Actions",
+            "Activate",
+            GLib.Variant("(sava{sv})", (action, [], {})),
+            None,
+            Gio.DBusCallFlags.NO_AUTO_START,
+            1000,
+            None,
+        )
+    except GLib.Error as err:
+        logger.debug(f"Could not activate {action} in the updater : {err}")
+        return False
+    return True
+
+
 def to_pkg_tuple(pkg_id):
     """Find the real package nevre & repoid from an package pkg_id"""
     (n, e, v, r, a, repo_id) = str(pkg_id).split(",")
@@ -95,18 +125,6 @@ def pkg_id_to_full_name(pkg_id):
         return f"{n}-{v}-{r}.{a}"
 
 
-def color_floats(spec):
-    rgba = Gdk.RGBA()
-    rgba.parse(spec)
-    return rgba.red, rgba.green, rgba.blue
-
-
-def get_color(spec):
-    rgba = Gdk.RGBA()
-    rgba.parse(spec)
-    return rgba
-
-
 def rgb_to_hex(red, green, blue):
     if isinstance(red, float):
         red *= 255
@@ -138,21 +156,6 @@ def format_block(block, indent):
     return result
 
 
-def get_style_color(widget):
-    """Get the default color for a widget in current theme."""
-    context = widget.get_style_context()
-    context.save()
-    context.set_state(Gtk.StateFlags.NORMAL)
-    color = context.get_color(context.get_state())
-    context.restore()
-    return color
-
-
-def do_gtk_events():
-    while Gtk.events_pending():  # process Gtk events
-        Gtk.main_iteration()
-
-
 def exception_handler(func):
     """
     This decorator catch yum backed exceptions
@@ -236,6 +239,8 @@ def format_number(number, SI=0, space=" "):
 
 
 def notify(summary, body):
+    from gi.repository import Notify  # pylint: disable=import-outside-toplevel
+
     Notify.init("Yum Extender")
     icon = "yumex-dnf"
     notification = Notify.Notification.new(summary, body, icon)
@@ -243,12 +248,6 @@ def notify(summary, body):
     notification.show()
 
 
-def check_dark_theme():
-    """Returns True if Gtk using a dark theme"""
-    gtk_settings = Gtk.Settings.get_default()
-    return gtk_settings.get_property("gtk-application-prefer-dark-theme")
-
-
 def logger_setup(
     logroot="yumex", logfmt="%(asctime)s: %(message)s", loglvl=logging.INFO
 ):
@@ -283,9 +282,17 @@ class YumexConf(config.BaseConfig):
     color_obsolete = config.Option("#FFB86C")
 
     history_days = config.IntOption(180)
+    # max. size (MB) of the on disk cache for changelogs, filelists etc.
+    attribute_cache_size = config.IntOption(64)
     newest_only = config.BoolOption(True)
     clean_unused = config.BoolOption(False)
     update_interval = config.IntOption(60)
+    # share the update check with the other users on the machine, only use it
+    # when all local users are trusted, any user can publish a result there is
+    # used by the others (ex. no updates, to hide the notifications)
+    shared_update_check = config.BoolOption(False)
+    # node_exporter textfile for the update check metrics ("" = disabled)
+    metrics_file = config.Option("")
     autocheck_updates = config.BoolOption(False)
     system_refresh = config.Option("2000-01-01 00:01")
     refresh_interval = config.IntOption(12)
@@ -301,6 +308,13 @@ class YumexConf(config.BaseConfig):
     info_paned = config.IntOption(450)
     win_maximized = config.BoolOption(False)
     auto_select_updates = config.BoolOption(False)
+    # resolve the queue in the background, while it is being build
+    background_depsolve = config.BoolOption(False)
+    # run transactions in the background, so the gui can still be used
+    background_transactions = config.BoolOption(False)
+    # minutes to keep the dnf daemon running, after yumex is closed or an
+    # update check is done (0 = exit), the updater closes it when the time is over
+    daemon_keepalive = config.IntOption(0)
     repo_saved = config.BoolOption(False)
     repo_enabled = config.KeyListOption([])
     archs = config.KeyListOption([])
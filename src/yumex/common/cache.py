@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+#    Yum Exteder (yumex) - A graphic package management tool
+#    Copyright (C) 2013 -2021 Tim Lauridsen < timlau<AT>fedoraproject<DOT>org >
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program; if not, write to
+#    the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+
+from xdg import BaseDirectory
+
+logger = logging.getLogger("yumex.common.cache")
+
+# package attribute cache, shared by yumex and the updater
+ATTRIBUTE_CACHE_FILE = "attributes.sqlite"
+# the access time of a cached attribute is only updated, if it is older
+# than this (seconds), so reading the cache don't write to the disk
+ATIME_RESOLUTION = 24 * 3600
+
+
+def get_cache_dir():
+    """Return the yumex user cache directory (created if missing)"""
+    return BaseDirectory.save_cache_path("yumex-dnf")
+
+
+def get_cache_file(name):
+    """Return the path of a named file in the yumex user cache directory"""
+    return os.path.join(get_cache_dir(), name)
+
+
+def write_json(path, data):
+    """Write data as json, the file is replaced atomically"""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="UTF-8") as out_file:
+            json.dump(data, out_file)
+        os.replace(tmp_path, path)
+    except OSError as err:
+        logger.debug(f"could not write {path} : {err}")
+
+
+def read_json(path, default=None):
+    """Read json data from a file, return default if not readable"""
+    try:
+        with open(path, "r", encoding="UTF-8") as in_file:
+            return json.load(in_file)
+    except (OSError, ValueError) as err:
+        logger.debug(f"could not read {path} : {err}")
+        return default
+
+
+class LRUCache:
+    """Bounded key/value cache, the least recently used items are dropped
+    when the cache is full.
+
+    The cache can be saved to and loaded from a json file, so keys must be
+    strings and values json serializable.
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        # values added or removed since the cache was loaded or saved
+        self.changed = False
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Get a cached value, and mark it as recently used"""
+        if key in self._data:
+            self._data.move_to_end(key)
+            return self._data[key]
+        return default
+
+    def put(self, key, value):
+        """Add a value to the cache, the oldest value is dropped if full"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self.changed = True
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        if key in self._data:
+            self.changed = True
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self.changed = bool(self._data)
+        self._data.clear()
+
+    def load(self, path):
+        """Load the cache content from a json file"""
+        data = read_json(path, [])
+        if isinstance(data, list):
+            for key, value in data[-self.maxsize :]:
+                self._data[key] = value
+
+    def save(self, path):
+        """Save the cache content to a json file (oldest first)"""
+        write_json(path, list(self._data.items()))
+        self.changed = False
+
+
+class AttributeCache:
+    """Persistent cache for package attributes, there never changes for a
+    given pkg_id (changelog, filelist etc.)
+
+    The values are stored as zlib compressed json in a sqlite db, the least
+    recently used values are removed, when the cache grows above max_size.
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self._db = None
+        self._size = 0
+        self._disabled = False
+
+    def _open(self):
+        if self._db is None and not self._disabled:
+            try:
+                self._db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS attributes ("
+                    "pkg_id TEXT, attr TEXT, data BLOB, atime REAL, "
+                    "PRIMARY KEY (pkg_id, attr))"
+                )
+                self._size = self._db.execute(
+                    "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM attributes"
+                ).fetchone()[0]
+            except sqlite3.Error as err:
+                logger.debug(f"attribute cache is disabled : {err}")
+                self._disabled = True
+                self._db = None
+        return self._db
+
+    def get(self, pkg_id, attr):
+        """Get a cached attribute value, None if not cached"""
+        db = self._open()
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                "SELECT data, atime FROM attributes WHERE pkg_id=? AND attr=?",
+                (pkg_id, attr),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > ATIME_RESOLUTION:
+                db.execute(
+                    "UPDATE attributes SET atime=? WHERE pkg_id=? AND attr=?",
+                    (now, pkg_id, attr),
+                )
+            return json.loads(zlib.decompress(row[0]))
+        except (sqlite3.Error, zlib.error, ValueError) as err:
+            logger.debug(f"could not read {attr} for {pkg_id} from cache : {err}")
+            return None
+
+    def put(self, pkg_id, attr, value):
+        """Add an attribute value to the cache"""
+        db = self._open()
+        if db is None or value is None:
+            return
+        data = zlib.compress(json.dumps(value).encode("utf-8"))
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO attributes VALUES (?, ?, ?, ?)",
+                (pkg_id, attr, data, time.time()),
+            )
+            self._size += len(data)
+            if self._size > self.max_size:
+                self._trim()
+        except sqlite3.Error as err:
+            logger.debug(f"could not write {attr} for {pkg_id} to cache : {err}")
+
+    def _trim(self):
+        """Remove the least recently used values, until the cache is below
+        3/4 of the max size, so we don't have to trim on every put
+        """
+        target = self.max_size * 3 // 4
+        size = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM attributes"
+        ).fetchone()[0]
+        rowids = []
+        for rowid, length in self._db.execute(
+            "SELECT rowid, LENGTH(data) FROM attributes ORDER BY atime"
+        ):
+            if size <= target:
+                break
+            rowids.append((rowid,))
+            size -= length
+        self._db.executemany("DELETE FROM attributes WHERE rowid=?", rowids)
+        logger.debug(f"attribute cache trimmed : {len(rowids)} values removed")
+        self._size = size
@@ -116,6 +116,38 @@ QUEUE_PACKAGE_TYPES = {
     "li": "localinstall",
 }
 
+# Delay (ms) from the last queue change to the background depsolve is started
+BACKGROUND_DEPSOLVE_DELAY = 2000
+
+# max. number of history transactions with cached package lists
+HISTORY_CACHE_SIZE = 500
+HISTORY_CACHE_FILE = "history-packages.json"
+# history transactions with more packages, is not expanded when shown
+HISTORY_EXPAND_LIMIT = 200
+# number of days of history, loaded at a time
+HISTORY_PAGE_DAYS = 30
+# package name -> history transactions index
+HISTORY_INDEX_FILE = "history-index.json"
+# max. number of package names shown in a history search
+HISTORY_SEARCH_LIMIT = 100
+# Delay (ms) before background history work is retried, when the gui is busy
+HISTORY_RETRY_DELAY = 250
+
+# Delay (ms) from the package selection is changed to the info is loaded
+INFO_UPDATE_DELAY = 150
+
+# filelists with more files, is shown in a list view
+FILELIST_VIEW_LIMIT = 2000
+
+# only the expired repos is refreshed, when they are at most this part of the
+# enabled repos, else all enabled repos is refreshed. the daemon rebuilds its
+# base every time the enabled repos is changed, so it is only faster, when
+# the download of the other repos is saved.
+PARTIAL_REFRESH_LIMIT = 0.5
+
+# package attributes, there is cached on disk (they never change for a pkg_id)
+CACHED_ATTRIBUTES = ("changelog", "filelist", "updateinfo", "requires")
+
 # Package info filters (widget : info_xxxxxx)
 PKGINFO_FILTERS = ["desc", "updinfo", "changelog", "files", "deps"]
 
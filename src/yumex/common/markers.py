@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#    Yum Exteder (yumex) - A graphic package management tool
+#    Copyright (C) 2013 -2021 Tim Lauridsen < timlau<AT>fedoraproject<DOT>org >
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program; if not, write to
+#    the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+"""
+    Cheap markers for the state of the rpmdb and the dnf metadata cache.
+
+    If the markers has not changed, the installed packages and the repository
+    metadata are the same, so the available updates are the same too.
+"""
+
+import logging
+import os
+import re
+import time
+
+from yumex.common.cache import get_cache_file, read_json, write_json
+
+logger = logging.getLogger("yumex.common.markers")
+
+# the rpmdb location depends on the distribution version
+RPMDB_DIRS = ("/var/lib/rpm", "/usr/lib/sysimage/rpm")
+DNF_CACHE_DIR = "/var/cache/dnf"
+# dnf metadata cache dirs are named <repo id>-<hash>
+REPO_CACHE_RE = re.compile(r"^(.+)-[0-9a-f]{16}$")
+# updates found by the updater, for the markers they was found with
+UPDATES_FILE = "updates.json"
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def get_rpmdb_marker():
+    """Return the newest mtime of the files in the rpmdb"""
+    marker = 0.0
+    for rpmdb_dir in RPMDB_DIRS:
+        try:
+            with os.scandir(rpmdb_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        marker = max(marker, entry.stat().st_mtime)
+        except OSError:
+            continue
+    return marker
+
+
+def get_repo_markers(cache_dir=DNF_CACHE_DIR):
+    """Return {repo id: mtime of repomd.xml} for the repos in the dnf cache
+
+    A repo can have more than one cache dir (ex. after a releasever or
+    baseurl change), the newest mtime is used, the stale dirs are not used
+    by dnf.
+    """
+    markers = {}
+    try:
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                match = REPO_CACHE_RE.match(entry.name)
+                if match and entry.is_dir():
+                    repomd = os.path.join(entry.path, "repodata", "repomd.xml")
+                    repo_id = match.group(1)
+                    markers[repo_id] = max(markers.get(repo_id, 0.0), _mtime(repomd))
+    except OSError as err:
+        logger.debug(f"could not read dnf cache dir : {err}")
+    return markers
+
+
+def get_markers():
+    """Return the current state markers for the rpmdb and the repo metadata"""
+    return {"rpmdb": get_rpmdb_marker(), "repos": get_repo_markers()}
+
+
+def get_metadata_age(markers):
+    """Return the age (seconds) of the oldest repo metadata, None if unknown"""
+    mtimes = [mtime for mtime in markers["repos"].values() if mtime]
+    if not mtimes:
+        return None
+    return time.time() - min(mtimes)
+
+
+def save_updates(markers, updates):
+    """Save the updates found with the default repos, for the given markers
+
+    :param markers: state markers from get_markers()
+    :param updates: list of [pkg_id, summary, size]
+    """
+    data = {"markers": markers, "timestamp": time.time(), "updates": updates}
+    write_json(get_cache_file(UPDATES_FILE), data)
+
+
+def load_updates(markers):
+    """Load the saved updates, if they are found with the given markers
+
+    :return: list of [pkg_id, summary, size] or None
+    """
+    data = read_json(get_cache_file(UPDATES_FILE))
+    if isinstance(data, dict) and data.get("markers") == markers:
+        return data.get("updates")
+    return None
@@ -19,7 +19,7 @@
 
 import os.path
 
-from gi.repository import Gtk
+from gi.repository import Gdk, Gtk
 import yumex.common.const as const
 
 
@@ -28,3 +28,36 @@ def load_ui(ui_file):
     ui.set_translation_domain("yumex-dnf")
     ui.add_from_file(os.path.join(const.UI_DIR, ui_file))
     return ui
+
+
+def color_floats(spec):
+    rgba = Gdk.RGBA()
+    rgba.parse(spec)
+    return rgba.red, rgba.green, rgba.blue
+
+
+def get_color(spec):
+    rgba = Gdk.RGBA()
+    rgba.parse(spec)
+    return rgba
+
+
+def get_style_color(widget):
+    """Get the default color for a widget in current theme."""
+    context = widget.get_style_context()
+    context.save()
+    context.set_state(Gtk.StateFlags.NORMAL)
+    color = context.get_color(context.get_state())
+    context.restore()
+    return color
+
+
+def do_gtk_events():
+    while Gtk.events_pending():  # process Gtk events
+        Gtk.main_iteration()
+
+
+def check_dark_theme():
+    """Returns True if Gtk using a dark theme"""
+    gtk_settings = Gtk.Settings.get_default()
+    return gtk_settings.get_property("gtk-application-prefer-dark-theme")
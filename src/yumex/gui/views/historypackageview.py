@@ -22,6 +22,7 @@ import logging
 from gi.repository import Gtk
 import yumex.common.const as const
 from yumex.common import _, CONFIG, pkg_id_to_full_name
+from yumex.common.cache import LRUCache
 
 logger = logging.getLogger("yumex.gui.views")
 
@@ -33,10 +34,15 @@ class HistoryPackageView(Gtk.TreeView):
         Gtk.TreeView.__init__(self)
         self.model = self.setup_view()
         self.base = base
+        self.connect("row-expanded", self.on_row_expanded)
+        # packages grouped by state, for the already shown transactions
+        self._grouped = LRUCache(const.HISTORY_CACHE_SIZE)
+        self._states = {}
+        self._placeholders = {}  # state -> placeholder row iter
 
     def setup_view(self):
         """Create Notebook list for single page"""
-        model = Gtk.TreeStore(str)
+        model = Gtk.TreeStore(str, str)  # label, state (category rows)
         self.set_model(model)
         cell = Gtk.CellRendererText()
         column = Gtk.TreeViewColumn(_("History Packages"), cell, markup=0)
@@ -48,9 +54,88 @@ class HistoryPackageView(Gtk.TreeView):
 
     def reset(self):
         self.model.clear()
+        self._states = {}
+        self._placeholders = {}
 
-    def populate(self, data):
-        self.model.clear()
+    def populate(self, data, key=None):
+        """Show the packages in a history transaction
+
+        The category rows are shown with package counts, for big transactions
+        the package rows is created when a category is expanded.
+
+        :param data: list of (pkg_id, state, is_installed)
+        :param key: unique key for the transaction, used to cache the grouping
+        """
+        self.reset()
+        states = self._grouped.get(key) if key else None
+        if states is None:
+            states = self._group_by_state(data)
+            if key:
+                self._grouped.put(key, states)
+        self._states = states
+        lazy = len(data) > const.HISTORY_EXPAND_LIMIT
+        # apply packages to model in right order
+        for state in const.HISTORY_SORT_ORDER:
+            if state in states:
+                num = len(states[state])
+                cat = self.model.append(
+                    None,
+                    [f"<b>{const.HISTORY_STATE_LABLES[state]} ({num})</b>", state],
+                )
+                if lazy:
+                    self._placeholders[state] = self.model.append(cat, ["", ""])
+                else:
+                    self._append_packages(cat, state)
+        if not lazy:
+            self.expand_all()
+
+    def _append_packages(self, cat, state):
+        for pkg_list in self._states[state]:
+            pkg_id, _, is_inst = pkg_list[0]
+            if is_inst:
+                color = CONFIG.conf.color_install
+                fullname = pkg_id_to_full_name(pkg_id)
+                name = f'<span foreground="{color}">{fullname}</span>'
+            else:
+                name = pkg_id_to_full_name(pkg_id)
+            pkg_cat = self.model.append(cat, [name, ""])
+            if len(pkg_list) == 2:
+                pkg_id, _, is_inst = pkg_list[1]
+                name = pkg_id_to_full_name(pkg_id)
+                self.model.append(pkg_cat, [name, ""])
+
+    def on_row_expanded(self, widget, iterator, path):
+        """Create the package rows, when a category is expanded"""
+        state = self.model.get_value(iterator, 1)
+        if state in self._placeholders:
+            self._append_packages(iterator, state)
+            # remove the placeholder after the children are added,
+            # else the row will be collapsed
+            self.model.remove(self._placeholders.pop(state))
+
+    def populate_search(self, result):
+        """Show the history of the packages found by a history search
+
+        :param result: list of (name, [[tid, date_time, state, pkg_id], ...])
+        """
+        self.reset()
+        for name, entries in result:
+            cat = self.model.append(None, [f"<b>{name} ({len(entries)})</b>", ""])
+            for tid, date_time, state, pkg_id in entries:
+                date_time = date_time.replace("T", " ")
+                fullname = pkg_id_to_full_name(pkg_id)
+                self.model.append(
+                    cat, [f"{date_time}  {state}  {fullname}  (#{tid})", ""]
+                )
+        if len(result) == 1:
+            self.expand_all()
+
+    @staticmethod
+    def _group_by_state(data):
+        """Group the history packages by state, update pairs are kept together
+
+        :return: {state: [[primary pkg elem, (related pkg elem)], ...]}
+        """
         # Order by package name.arch
         names = {}
         names_pair = {}
@@ -92,24 +177,4 @@ class HistoryPackageView(Gtk.TreeView):
                 states[state].append(pkg_list)
             else:
                 states[state] = [pkg_list]
-        # apply packages to model in right order
-        for state in const.HISTORY_SORT_ORDER:
-            if state in states:
-                num = len(states[state])
-                cat = self.model.append(
-                    None, [f"<b>{const.HISTORY_STATE_LABLES[state]} ({num})</b>"]
-                )
-                for pkg_list in states[state]:
-                    pkg_id, _, is_inst = pkg_list[0]
-                    if is_inst:
-                        color = CONFIG.conf.color_install
-                        fullname = pkg_id_to_full_name(pkg_id)
-                        name = f'<span foreground="{color}">{fullname}</span>'
-                    else:
-                        name = pkg_id_to_full_name(pkg_id)
-                    pkg_cat = self.model.append(cat, [name])
-                    if len(pkg_list) == 2:
-                        pkg_id, _, is_inst = pkg_list[1]
-                        name = pkg_id_to_full_name(pkg_id)
-                        self.model.append(pkg_cat, [name])
-        self.expand_all()
+        return states
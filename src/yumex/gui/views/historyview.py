@@ -19,13 +19,90 @@
 
 import logging
 
-from gi.repository import Gtk
+import yumex.common.const as const
+from gi.repository import GLib, Gtk
 from yumex.common import _
+from yumex.common.cache import LRUCache, get_cache_file, read_json, write_json
 from yumex.gui.views.historypackageview import HistoryPackageView
 
 logger = logging.getLogger("yumex.gui.views")
 
 
+class HistoryIndex:
+    """Index of package name -> history transactions, saved between sessions
+
+    The index is only extended with transactions, there is not indexed yet.
+    The index can be big, so it is not loaded before it is used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dates = {}  # tid -> date/time of the indexed transactions
+        self.names = {}  # name -> [[tid, date_time, state, pkg_id], ...]
+        self._changed = False
+        self._loaded = False
+
+    def load(self):
+        """Load the index from disk, if it is not loaded yet"""
+        if self._loaded:
+            return
+        self._loaded = True
+        data = read_json(self.path, {})
+        if isinstance(data, dict):
+            self.dates = {int(tid): dt for tid, dt in data.get("dates", {}).items()}
+            self.names = data.get("names", {})
+
+    def save(self):
+        if self._changed:
+            write_json(self.path, {"dates": self.dates, "names": self.names})
+            self._changed = False
+
+    def clear(self):
+        self._loaded = True
+        self.dates = {}
+        self.names = {}
+        self._changed = True
+
+    def validate(self, dates):
+        """Check the indexed transactions against the history {tid: date_time},
+        if a tid is indexed with another date/time, the history db has been
+        recreated, so the index is cleared
+        """
+        self.load()
+        for tid, date_time in dates.items():
+            if tid in self.dates and self.dates[tid] != date_time:
+                logger.debug("history has changed, clearing history index")
+                self.clear()
+                return
+
+    def is_indexed(self, tid):
+        self.load()
+        return tid in self.dates
+
+    def add(self, tid, date_time, pkgs):
+        """Add the packages (pkg_id, state, is_installed) of a transaction"""
+        self.load()
+        for pkg_id, state, _is_inst in pkgs:
+            name = str(pkg_id).split(",")[0]
+            self.names.setdefault(name, []).append([tid, date_time, state, pkg_id])
+        self.dates[tid] = date_time
+        self._changed = True
+
+    def search(self, key):
+        """Find packages, where the name contains the key
+
+        :return: [(name, [[tid, date_time, state, pkg_id], ...]), ...]
+                 the transactions for each name are ordered newest first
+        """
+        self.load()
+        key = key.lower()
+        names = sorted(name for name in self.names if key in name.lower())
+        return [
+            (name, sorted(self.names[name], key=lambda e: e[1], reverse=True))
+            for name in names[: const.HISTORY_SEARCH_LIMIT]
+        ]
+
+
 class HistoryView(Gtk.TreeView):
     """History View Class"""
 
@@ -35,7 +112,27 @@ class HistoryView(Gtk.TreeView):
         self.base = base
         self.pkg_view = HistoryPackageView(self.base)
         self.connect("cursor-changed", self.on_cursor_changed)
+        self.connect("row-expanded", self.on_row_expanded)
         self.is_populated = False
+        self._dates = {}  # tid -> date/time
+        # history tree data {year: {month: {day: [(time, tid), ...]}}}
+        # the month and day rows are only created, when the parent is expanded
+        self._tree = {}
+        self._rows = {}  # tree key -> row iter
+        self._placeholders = {}  # tree key -> placeholder row iter
+        self._history_days = 0
+        self._next_day = 0
+        self._page_id = None
+        # package lists for already seen transactions, a transaction never
+        # changes, so the cache is kept between sessions (loaded on first use)
+        self._pkg_cache = LRUCache(const.HISTORY_CACHE_SIZE)
+        self._pkg_cache_loaded = False
+        self._fetching = False
+        self._prefetch_tids = []
+        self._prefetch_id = None
+        self._index = HistoryIndex(get_cache_file(const.HISTORY_INDEX_FILE))
+        self._index_id = None
+        self._index_tids = []  # loaded transactions, there is not indexed yet
 
     def setup_view(self):
         """Create Notebook list for single page"""
@@ -53,36 +150,213 @@ class HistoryView(Gtk.TreeView):
         self.model.clear()
         self.is_populated = False
         self.pkg_view.reset()
+        self._clear_tree()
+        if self._page_id is not None:
+            GLib.source_remove(self._page_id)
+            self._page_id = None
+        if self._index_id is not None:
+            GLib.source_remove(self._index_id)
+            self._index_id = None
+
+    def _clear_tree(self):
+        self._tree = {}
+        self._rows = {}
+        self._placeholders = {}
+
+    def load(self, days):
+        """Load the history for the last days, newest first.
+
+        The first page is loaded now, the rest is added in the background
+        """
+        self._history_days = days
+        if not self._pkg_cache_loaded:
+            self._pkg_cache.load(get_cache_file(const.HISTORY_CACHE_FILE))
+            self._pkg_cache_loaded = True
+        end = min(const.HISTORY_PAGE_DAYS, days)
+        self.populate(self._get_history(0, end))
+        self._next_day = end + 1
+        if self._next_day <= days:
+            self._page_id = GLib.idle_add(
+                self._on_load_page, priority=GLib.PRIORITY_LOW
+            )
+        else:
+            self._start_indexing()
+
+    def _get_history(self, start, end):
+        self._fetching = True
+        try:
+            return self.base.get_root_backend().GetHistoryByDays(start, end)
+        finally:
+            self._fetching = False
+
+    def _on_load_page(self):
+        """Add the next page of history to the view"""
+        self._page_id = None
+        if not self.is_populated or self.base.transaction_running:
+            return False
+        # a daemon call is running a nested mainloop, try again later
+        if self._fetching or self.base.is_working:
+            self._page_id = GLib.timeout_add(
+                const.HISTORY_RETRY_DELAY, self._on_load_page
+            )
+            return False
+        start = self._next_day
+        end = min(start + const.HISTORY_PAGE_DAYS - 1, self._history_days)
+        logger.debug(f"loading history page : days {start} - {end}")
+        self.add_history(self._get_history(start, end))
+        self._next_day = end + 1
+        if self._next_day <= self._history_days:
+            self._page_id = GLib.idle_add(
+                self._on_load_page, priority=GLib.PRIORITY_LOW
+            )
+        else:
+            self._start_indexing()
+        return False
+
+    def _start_indexing(self):
+        self._index.validate(self._dates)
+        self._index_tids = [
+            tid
+            for tid in sorted(self._dates, reverse=True)
+            if not self._index.is_indexed(tid)
+        ]
+        logger.debug(f"history transactions to index : {len(self._index_tids)}")
+        self._schedule_indexing()
+
+    def _schedule_indexing(self, delay=0):
+        """Add the loaded transactions to the search index, when the gui is idle"""
+        if self._index_id is None:
+            if delay:
+                self._index_id = GLib.timeout_add(delay, self._on_index)
+            else:
+                self._index_id = GLib.idle_add(
+                    self._on_index, priority=GLib.PRIORITY_LOW
+                )
+
+    def _on_index(self):
+        """Index the next (newest first) not indexed transaction"""
+        self._index_id = None
+        if not self.is_populated or self.base.transaction_running:
+            self._index.save()
+            return False
+        # a daemon call is running a nested mainloop, try again later
+        if self._fetching or self.base.is_working:
+            self._schedule_indexing(const.HISTORY_RETRY_DELAY)
+            return False
+        if not self._index_tids:
+            logger.debug("history index is up to date")
+            self._index.save()
+            return False
+        tid = self._index_tids.pop(0)
+        date_time = self._dates[tid]
+        entry = self._pkg_cache.get(str(tid))
+        if entry and entry[0] == date_time:
+            pkgs = entry[1]
+        else:  # don't fill the package cache with the indexed transactions
+            self._fetching = True
+            try:
+                pkgs = self.base.get_root_backend().GetHistoryPackages(tid)
+            finally:
+                self._fetching = False
+        self._index.add(tid, date_time, pkgs)
+        self._schedule_indexing()
+        return False
+
+    def search(self, key):
+        """Show the history for the packages matching the key,
+        if the key is empty, the selected transaction is shown again
+        """
+        if key:
+            self.pkg_view.populate_search(self._index.search(key))
+        else:
+            self.on_cursor_changed(self)
 
     def populate(self, data):
         self.pkg_view.reset()
         self.model.clear()
-        main = {}
+        self._clear_tree()
+        self.add_history(data)
+        self.collapse_all()
+        # expand and select the newest transaction
+        if self.model.get_iter_first():
+            self.expand_row(Gtk.TreePath.new_from_string("0"), False)
+            self.expand_row(Gtk.TreePath.new_from_string("0:0"), False)
+            path = Gtk.TreePath.new_from_string("0:0:0:0")
+            self.expand_to_path(path)
+            self.get_selection().select_path(path)
+            self.on_cursor_changed(self)
+        self.is_populated = True
+
+    def add_history(self, data):
+        """Add history transactions [(tid, date_time), ...] to the view"""
         for tid, date_time in data:
+            if self._is_added(date_time, tid):  # pages can overlap
+                continue
+            self._dates[tid] = date_time
             date, time = date_time.split("T")
             year, month, day = date.split("-")
-            # year
-            if year not in main:
-                ycat = self.model.append(None, [year, -1])
-                main[year] = (ycat, {})
-            ycat, mdict = main[year]
-            # month
-            if month not in mdict:
-                mcat = self.model.append(ycat, [month, -1])
-                mdict[month] = (mcat, {})
-            mcat, ddict = mdict[month]
-            # day
-            if day not in ddict:
-                dcat = self.model.append(mcat, [day, -1])
-                ddict[day] = dcat
-            dcat = ddict[day]
-            self.model.append(dcat, [time, tid])
-        self.collapse_all()
-        path = Gtk.TreePath.new_from_string("0:0:0:0")
-        self.expand_to_path(path)
-        self.get_selection().select_path(path)
-        self.on_cursor_changed(self)
-        self.is_populated = True
+            months = self._tree.setdefault(year, {})
+            if year not in self._rows:
+                self._rows[year] = self._append_category(None, year, year)
+            days = months.setdefault(month, {})
+            if self._is_filled(year) and (year, month) not in self._rows:
+                self._rows[(year, month)] = self._append_category(
+                    self._rows[year], (year, month), month
+                )
+            days.setdefault(day, []).append((time, tid))
+            if self._is_filled((year, month)):
+                self._append_day(year, month, day)
+                self.model.append(self._rows[(year, month, day)], [time, tid])
+
+    def _is_added(self, date_time, tid):
+        date, time = date_time.split("T")
+        year, month, day = date.split("-")
+        entries = self._tree.get(year, {}).get(month, {}).get(day, [])
+        return (time, tid) in entries
+
+    def _is_filled(self, key):
+        """Check if the children of a category row has been created"""
+        return key in self._rows and key not in self._placeholders
+
+    def _append_category(self, parent, key, label):
+        """Append a category row, with a placeholder as child,
+        the real children is created when the row is expanded
+        """
+        iterator = self.model.append(parent, [label, -1])
+        self._placeholders[key] = self.model.append(iterator, ["", -1])
+        return iterator
+
+    def _append_day(self, year, month, day):
+        if (year, month, day) not in self._rows:
+            self._rows[(year, month, day)] = self.model.append(
+                self._rows[(year, month)], [day, -1]
+            )
+
+    def on_row_expanded(self, widget, iterator, path):
+        """Create the children of a year or month row, when expanded"""
+        if path.get_depth() == 1:
+            key = self.model.get_value(iterator, 0)
+        elif path.get_depth() == 2:
+            parent = self.model.iter_parent(iterator)
+            key = (self.model.get_value(parent, 0), self.model.get_value(iterator, 0))
+        else:
+            return
+        if key not in self._placeholders:
+            return
+        if path.get_depth() == 1:
+            for month in self._tree[key]:
+                self._rows[(key, month)] = self._append_category(
+                    iterator, (key, month), month
+                )
+        else:
+            year, month = key
+            for day, entries in self._tree[year][month].items():
+                self._append_day(year, month, day)
+                for time, tid in entries:
+                    self.model.append(self._rows[(year, month, day)], [time, tid])
+        # remove the placeholder after the children are added,
+        # else the row will be collapsed
+        self.model.remove(self._placeholders.pop(key))
 
     def on_cursor_changed(self, widget):
         """
@@ -92,9 +366,67 @@ class HistoryView(Gtk.TreeView):
             (model, iterator) = widget.get_selection().get_selected()
             if model is not None and iterator is not None:
                 tid = model.get_value(iterator, 1)
-                if tid != -1:
-                    pkgs = self.base.get_root_backend().GetHistoryPackages(tid)
-                    self.pkg_view.populate(pkgs)
+                if tid != -1 and not self.base.transaction_running:
+                    pkgs = self.get_packages(tid)
+                    self.pkg_view.populate(pkgs, key=f"{tid} {self._dates.get(tid)}")
+                    self._schedule_prefetch([tid - 1, tid + 1])
+
+    def get_packages(self, tid):
+        """Get the packages for a history transaction, from cache if possible"""
+        date_time = self._dates.get(tid)
+        entry = self._pkg_cache.get(str(tid))
+        # the date/time is checked, in case the history db has been recreated
+        if entry and entry[0] == date_time:
+            return entry[1]
+        self._fetching = True
+        try:
+            pkgs = self.base.get_root_backend().GetHistoryPackages(tid)
+        finally:
+            self._fetching = False
+        self._pkg_cache.put(str(tid), [date_time, pkgs])
+        return pkgs
+
+    def _is_cached(self, tid):
+        entry = self._pkg_cache.get(str(tid))
+        return entry is not None and entry[0] == self._dates.get(tid)
+
+    def _schedule_prefetch(self, tids):
+        """Fetch the packages for the given tids, when the gui is idle"""
+        self._prefetch_tids = [
+            tid for tid in tids if tid in self._dates and not self._is_cached(tid)
+        ]
+        if self._prefetch_tids and self._prefetch_id is None:
+            self._prefetch_id = GLib.idle_add(
+                self._on_prefetch, priority=GLib.PRIORITY_LOW
+            )
+
+    def _on_prefetch(self):
+        self._prefetch_id = None
+        if self.base.transaction_running:
+            return False
+        # a daemon call is running a nested mainloop, try again later
+        if self._fetching or self.base.is_working:
+            self._prefetch_id = GLib.timeout_add(
+                const.HISTORY_RETRY_DELAY, self._on_prefetch
+            )
+            return False
+        if self._prefetch_tids:
+            tid = self._prefetch_tids.pop(0)
+            logger.debug(f"prefetching history packages for tid : {tid}")
+            self.get_packages(tid)
+        if self._prefetch_tids:
+            self._prefetch_id = GLib.idle_add(
+                self._on_prefetch, priority=GLib.PRIORITY_LOW
+            )
+        return False
+
+    def save_cache(self):
+        """Save the history package cache and search index to disk,
+        if they have been changed
+        """
+        if self._pkg_cache.changed:
+            self._pkg_cache.save(get_cache_file(const.HISTORY_CACHE_FILE))
+        self._index.save()
 
     def get_selected(self):
         """Return the currently selected history tid"""
@@ -17,9 +17,11 @@
 #    the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 
+import hashlib
 import logging
 
 import yumex.common.const as const
+from yumex.common import CONFIG
 
 logger = logging.getLogger("yumex.gui.views")
 
@@ -46,6 +48,15 @@ class PackageQueue:
         self.groups = {"i": {}, "r": {}}
         self._name_arch_index = {}
 
+    def copy(self):
+        """Get a copy of the queue"""
+        queue = PackageQueue()
+        for key, pkgs in self.packages.items():
+            queue.packages[key] = list(pkgs)
+        queue.groups = {action: dict(grps) for action, grps in self.groups.items()}
+        queue._name_arch_index = dict(self._name_arch_index)
+        return queue
+
     def get(self, action=None):
         if action is None:
             return self.packages
@@ -60,6 +71,21 @@ class PackageQueue:
         num += len(self.groups["r"].keys())
         return num
 
+    def fingerprint(self):
+        """Get a fingerprint of the queue content and the session settings,
+        there affects the dependency resolution
+        """
+        items = []
+        for action, pkgs in self.packages.items():
+            items.extend(f"{action}:{pkg.pkg_id}" for pkg in pkgs)
+        items.extend(f"group-{action}:{grp_id}" for grp_id, action in self.get_groups())
+        items.sort()
+        items.append(f"clean_unused:{CONFIG.session.clean_unused}")
+        items.append(f"clean_instonly:{CONFIG.session.clean_instonly}")
+        items.append(f"installonly_limit:{CONFIG.conf.installonly_limit}")
+        items.append(f"enabled_repos:{','.join(CONFIG.session.enabled_repos)}")
+        return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()
+
     def add(self, pkg, action=None):
         """Add a package to queue"""
         if not action:
@@ -78,6 +104,23 @@ class PackageQueue:
             self.packages[action].remove(pkg)
             del self._name_arch_index[name_arch]
 
+    def is_update_all(self, update_set):
+        """Check if the queue contains all updates & obsoletes and nothing else
+
+        @param update_set: set with all available updates & obsoletes
+        """
+        if not update_set:
+            return False
+        for key in const.QUEUE_PACKAGE_TYPES:
+            if key not in ("u", "o") and self.packages[key]:
+                return False
+        if self.groups["i"] or self.groups["r"]:
+            return False
+        queued = self.packages["u"] + self.packages["o"]
+        if len(queued) != len(update_set):
+            return False
+        return set(queued) == update_set
+
     def has_pkg_with_name_arch(self, pkg):
         name_arch = f"{pkg.name}.{pkg.arch}"
         return name_arch in self._name_arch_index
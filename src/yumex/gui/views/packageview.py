@@ -20,7 +20,8 @@
 import logging
 
 from gi.repository import GObject, Gtk
-from yumex.common import timer, _, do_gtk_events
+from yumex.common import timer, _
+from yumex.gui import do_gtk_events
 
 from yumex.gui.views.selectionview import SelectionView
 
@@ -33,11 +33,14 @@ class QueueView(Gtk.TreeView):
         "queue-refresh": (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_INT,))
     }
 
-    def __init__(self, queue_menu):
+    def __init__(self, queue_menu, get_update_set=None):
         Gtk.TreeView.__init__(self)
         self.store = self._setup_model()
         self.queue = PackageQueue()
         self.queue_menu = queue_menu
+        # callable returning the set of all available updates & obsoletes
+        self._get_update_set = get_update_set
+        self._update_all_label = None
         self.connect("button-press-event", self.on_queue_view_button_press)
         remove_menu = self.queue_menu.get_children()[
             0
@@ -66,11 +69,18 @@ class QueueView(Gtk.TreeView):
     def delete_selected(self, widget=None):
         rmvlist = []
         model, paths = self.get_selection().get_selected_rows()
+        remove_updates = False
         for path in paths:
             row = model[path]
             if row.parent is not None:
-                rmvlist.append(row[0])
-        for pkg in self.filter_pkgs_from_list(rmvlist):
+                if row[0] == self._update_all_label:
+                    remove_updates = True
+                else:
+                    rmvlist.append(row[0])
+        pkgs = self.filter_pkgs_from_list(rmvlist)
+        if remove_updates:
+            pkgs.extend(self.queue.packages["u"] + self.queue.packages["o"])
+        for pkg in pkgs:
             self.queue.remove(pkg)
             if pkg.queued == "do" and pkg.installed:
                 pkg.downgrade_po.queued = None
@@ -81,6 +91,43 @@ class QueueView(Gtk.TreeView):
         self.queue.remove_groups(rmvlist)
         self.refresh()
 
+    def clear_queue(self):
+        """Remove everything from the queue and unselect the packages & groups"""
+        for pkgs in self.queue.packages.values():
+            for pkg in pkgs:
+                pkg.queued = None
+                pkg.set_select(False)
+                if pkg.downgrade_po:
+                    pkg.downgrade_po.queued = None
+                    pkg.downgrade_po.set_select(False)
+        for action in ("i", "r"):
+            for grp in self.queue.groups[action].values():
+                grp.selected = False
+        self.queue.clear()
+        self.refresh()
+
+    def restore_queue(self, queue):
+        """Add the content of a queue, there could not be applied, back to
+        the queue and select the packages & groups again.
+
+        Packages with the same name & arch as a package already in the queue
+        is skipped.
+        """
+        for action, pkgs in queue.packages.items():
+            for pkg in pkgs:
+                if self.queue.has_pkg_with_name_arch(pkg):
+                    continue
+                pkg.queued = action
+                pkg.set_select(True)
+                if pkg.downgrade_po:
+                    pkg.downgrade_po.queued = action
+                    pkg.downgrade_po.set_select(True)
+                self.queue.add(pkg, action)
+        for action in ("i", "r"):
+            for grp in queue.groups[action].values():
+                self.queue.add_group(grp, action)
+        self.refresh()
+
     def on_queue_view_button_press(self, treeview, event):
         """
         Mouse button clicked in package view handler
@@ -104,14 +151,24 @@ class QueueView(Gtk.TreeView):
                 rclist.extend([x for x in pkg_list if str(x) in rlist])
         return rclist
 
+    def is_update_all(self):
+        """Check if the queue contains all available updates and nothing else"""
+        if self._get_update_set is None:
+            return False
+        return self.queue.is_update_all(self._get_update_set())
+
     def refresh(self):
         """Populate view with data from queue"""
         self.store.clear()
+        self._update_all_label = None
         pkg_list = self.queue.packages["u"] + self.queue.packages["o"]
         text = ngettext("Package to update", "Packages to update", len(pkg_list))
         label = f"<b>{text}</b>"
         if len(pkg_list) > 0:
-            self.populate_list(label, pkg_list)
+            if self.is_update_all():
+                self.populate_update_all(label, len(pkg_list))
+            else:
+                self.populate_list(label, pkg_list)
         pkg_list = self.queue.packages["i"]
         text = ngettext("Package to install", "Packages to install", len(pkg_list))
         label = f"<b>{text}</b>"
@@ -151,6 +208,12 @@ class QueueView(Gtk.TreeView):
         for pkg in pkg_list:
             self.store.append(parent, [str(pkg), pkg.summary])
 
+    def populate_update_all(self, label, num):
+        """Show a single row for the whole update set, instead of a row per package"""
+        parent = self.store.append(None, [label, ""])
+        self._update_all_label = _("All available updates (%d)") % num
+        self.store.append(parent, [self._update_all_label, ""])
+
     def populate_group_list(self, label, grps):
         parent = self.store.append(None, [label, ""])
         for grp in grps.values():
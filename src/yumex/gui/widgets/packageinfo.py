@@ -24,8 +24,9 @@ import urllib.parse
 
 import hawkey
 import yumex.common.const as const
-from gi.repository import Gdk, GObject, Gtk, Pango
-from yumex.common import _, check_dark_theme, format_block, is_url, pkg_id_to_full_name
+from gi.repository import Gdk, GLib, GObject, Gtk, Pango
+from yumex.common import _, format_block, is_url, pkg_id_to_full_name
+from yumex.gui import check_dark_theme
 
 logger = logging.getLogger("yumex.gui.widget")
 
@@ -47,14 +48,19 @@ class PackageDetails(GObject.GObject):
 
         self._text = self.win.get_ui("info_text")
         self._text.connect("motion_notify_event", self.on_mouse_motion)
+        self._content_sw = self._text.get_parent()
+        self._list_view = None  # list view for very long content
+        self._list_store = None
+        self._pending = None  # buffered (text, tag, url) segments
+        self._pending_list = None  # buffered lines for the list view
         self._buffer = self.win.get_ui("info_buffer")
         self._tags = self.win.get_ui("info_tags")
         self._default_style = self._tags.lookup("")
         self._url_handler = url_handler
-        # List of active URLs in the tab
+        # pool of url tags, reused every time the info is cleared
         self.url_tags = []
-        self.underlined_url = False
-        self.url_list = {}
+        self.url_list = {}  # url tag -> url, for the urls in the buffer
+        self.underlined_url = None
         self._listbox.select_row(self.win.get_ui("list_desc"))
 
     def set_active(self, key):
@@ -81,24 +87,106 @@ class PackageDetails(GObject.GObject):
         style = self._tags.lookup(tag_name)
         return style
 
-    def write(self, txt, style_name=None, newline=True):
+    def write(self, txt, style_name=None, newline=True, tag=None):
+        """Write text to the info buffer
+
+        :param txt: text to write
+        :param style_name: name of the style tag to use
+        :param newline: add a newline, if missing
+        :param tag: tag to use, instead of a named style
+        """
         if not txt:
             return
         if newline and txt[-1] != "\n":
             txt += "\n"
+        style = tag or self.get_style(style_name or "description")
+        if self._pending is not None:
+            self._pending.append((txt, style, None))
+            return
         _, end = self._buffer.get_bounds()
-        if style_name:
-            style = self.get_style(style_name)
-        else:
-            style = self.get_style("description")
         if style:
             self._buffer.insert_with_tags(end, txt, style)
         else:
             self._buffer.insert(end, txt)
         self._text.scroll_to_iter(self._buffer.get_end_iter(), 0.0, True, 0.0, 0.0)
 
+    def begin(self):
+        """Start buffering the written text, until flush() is called"""
+        self._pending = []
+        self._pending_list = None
+
+    def discard(self):
+        """Drop the buffered text"""
+        self._pending = None
+        self._pending_list = None
+
+    def flush(self):
+        """Insert the buffered text in a single pass, and apply the styles"""
+        pending, self._pending = self._pending, None
+        lines, self._pending_list = self._pending_list, None
+        if lines is not None:
+            self.write_list(lines)
+        if not pending:
+            return
+        _, end = self._buffer.get_bounds()
+        offset = end.get_offset()
+        self._buffer.insert(end, "".join(txt for txt, _style, _url in pending))
+        # join segments with the same style, to apply each tag only once
+        runs = []
+        for txt, style, url in pending:
+            if url:
+                style = self._get_url_tag(url)
+            if runs and runs[-1][0] is style:
+                runs[-1][1] += len(txt)
+            else:
+                runs.append([style, len(txt)])
+        for style, length in runs:
+            if style:
+                self._buffer.apply_tag(
+                    style,
+                    self._buffer.get_iter_at_offset(offset),
+                    self._buffer.get_iter_at_offset(offset + length),
+                )
+            offset += length
+
+    def write_list(self, lines):
+        """Show the lines in a list view, there only renders the visible rows"""
+        if self._pending is not None:
+            self._pending_list = lines
+            return
+        if self._list_view is None:
+            self._list_store = Gtk.ListStore(str)
+            self._list_view = Gtk.TreeView()
+            self._list_view.set_headers_visible(False)
+            cell = Gtk.CellRendererText()
+            cell.set_property("family", "monospace")
+            column = Gtk.TreeViewColumn("", cell, text=0)
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            self._list_view.append_column(column)
+            self._list_view.set_fixed_height_mode(True)
+            self._list_view.get_style_context().add_class("pkginfo__text")
+        # detach the model while it is filled
+        self._list_view.set_model(None)
+        self._list_store.clear()
+        for line in lines:
+            self._list_store.append([line])
+        self._list_view.set_model(self._list_store)
+        self._set_content(self._list_view)
+
+    def _set_content(self, widget):
+        """Show the text view or the list view in the info pane"""
+        current = self._content_sw.get_child()
+        if current is not widget:
+            self._content_sw.remove(current)
+            self._content_sw.add(widget)
+            widget.show()
+
     def clear(self):
         self._buffer.set_text("")
+        self._set_content(self._text)
+        # the url tags can be reused
+        self.url_list.clear()
+        self._set_underline(None)
 
     def goto_top(self):
         self._text.scroll_to_iter(self._buffer.get_start_iter(), 0.0, False, 0.0, 0.0)
@@ -106,10 +194,25 @@ class PackageDetails(GObject.GObject):
     def on_url_event(self, tag, widget, event, iterator):
         """Catch when the user clicks the URL"""
         if event.type == Gdk.EventType.BUTTON_RELEASE:
-            url = self.url_list[tag.get_property("name")]
-            if self._url_handler:
+            url = self.url_list.get(tag)
+            if url and self._url_handler:
                 self._url_handler(url)
 
+    def _set_underline(self, tag):
+        """Underline the url tag under the mouse pointer (None = no url)"""
+        if tag is self.underlined_url:
+            return
+        window = self._text.get_window(Gtk.TextWindowType.TEXT)
+        if self.underlined_url:
+            self.underlined_url.set_property("underline", Pango.Underline.NONE)
+            if window:
+                window.set_cursor(None)
+        if tag:
+            tag.set_property("underline", Pango.Underline.SINGLE)
+            if window:
+                window.set_cursor(Gdk.Cursor(Gdk.CursorType.HAND2))
+        self.underlined_url = tag
+
     def on_mouse_motion(self, widget, event, data=None):
         """
         Mouse movement handler for TextView
@@ -127,36 +230,35 @@ class PackageDetails(GObject.GObject):
         itr = widget.get_iter_at_location(x, y)
         if isinstance(itr, tuple):
             itr = itr[1]
-            tags = itr.get_tags()
-            # Remove underline and hand mouse pointer
-            if self.underlined_url:
-                self.underlined_url.set_property("underline", Pango.Underline.NONE)
-                widget.get_window(Gtk.TextWindowType.TEXT).set_cursor(None)
-                self.underlined_url = None
-            for tag in tags:
-                if tag in self.url_tags:
-                    # underline the tags and change mouse pointer to hand
-                    tag.set_property("underline", Pango.Underline.SINGLE)
-                    widget.get_window(Gtk.TextWindowType.TEXT).set_cursor(
-                        Gdk.Cursor(Gdk.CursorType.HAND2)
-                    )
-                    self.underlined_url = tag
+            url_tag = None
+            for tag in itr.get_tags():
+                if tag in self.url_list:
+                    url_tag = tag
+                    break
+            # underline the url and change mouse pointer to hand
+            self._set_underline(url_tag)
         return False
 
-    def add_url(self, text, url, newline=False):
-        """Append URL to textbuffer and connect an event"""
-        # Try to see if we already got the current url as a tag
-        tag = self._tags.lookup(text)
-        if not tag:
-            if check_dark_theme():
-                tag = self._buffer.create_tag(text, foreground="#ff7800")
-            else:
-                tag = self._buffer.create_tag(text, foreground="#ff7800")
+    def _get_url_tag(self, url):
+        """Get a free url tag from the pool, and connect it to the url"""
+        ndx = len(self.url_list)
+        if ndx < len(self.url_tags):
+            tag = self.url_tags[ndx]
+        else:
+            tag = self._buffer.create_tag(None, foreground="#ff7800")
             tag.connect("event", self.on_url_event)
             self.url_tags.append(tag)
-            self.url_list[text] = url
-        self.write(text, style_name=text, newline=False)
-        self.write(" ", style_name="describtion", newline=newline)
+        self.url_list[tag] = url
+        return tag
+
+    def add_url(self, text, url, newline=False):
+        """Append URL to textbuffer and connect an event"""
+        if self._pending is not None:
+            # the url tag is taken from the pool, when the buffer is flushed
+            self._pending.append((text, None, url))
+        else:
+            self.write(text, tag=self._get_url_tag(url), newline=False)
+        self.write(" ", newline=newline)
 
 
 class PackageInfo(PackageDetails):
@@ -170,31 +272,87 @@ class PackageInfo(PackageDetails):
         self.base = base
         self.current_package = None
         self.active_filter = const.PKGINFO_FILTERS[0]
+        self._update_id = None
+        self._generation = 0  # changed every time, the shown info is changed
+        self._loading = False
         self.connect("info-changed", self.on_filter_changed)
         self.update()
 
     def on_filter_changed(self, widget, data):
         self.active_filter = data
-        self.update()
+        self._schedule_update(0)
 
     def set_package(self, pkg):
         """
         Set current active package to show information about in the
         Package Info view.
 
+        The information is loaded, when the selection has not changed for
+        a short while, so moving through the package list is not blocked.
+
         :param pkg: package to set as active package
         """
         self.current_package = pkg
-        self.win.set_working(True, True)
-        self.update()
-        self.win.set_working(False)
+        self._generation += 1
+        if pkg is None:
+            self._cancel_update()
+            self._show_placeholder("")
+        else:
+            self._show_placeholder(_("Loading package information..."))
+            self._schedule_update(const.INFO_UPDATE_DELAY)
+
+    def _show_placeholder(self, txt):
+        # written directly, an update can be buffering in a nested mainloop
+        self._buffer.set_text(txt)
+        self._set_content(self._text)
+
+    def _cancel_update(self):
+        if self._update_id is not None:
+            GLib.source_remove(self._update_id)
+            self._update_id = None
+
+    def _schedule_update(self, delay):
+        self._cancel_update()
+        self._update_id = GLib.timeout_add(delay, self._on_update)
+
+    def _on_update(self):
+        self._update_id = None
+        if self._loading:
+            # an update is waiting for the daemon in a nested mainloop
+            # it is discarded, so try again when it is done
+            self._generation += 1
+            self._schedule_update(const.INFO_UPDATE_DELAY)
+        else:
+            self.update()
+        return False
 
     def update(self):
         """
         update the information in the Package info view
         """
+        self._generation += 1
+        generation = self._generation
+        self._loading = True
+        try:
+            self._update()
+        finally:
+            self._loading = False
+        # the selection has changed, while the info was loaded
+        if generation != self._generation:
+            logger.debug("package info is outdated, discarding it")
+            self.discard()
+            return
         self.clear()
-        if self.current_package:
+        self.flush()
+        self.goto_top()
+
+    def _update(self):
+        self.begin()
+        if self.current_package and self.base.transaction_running:
+            self.write(
+                _("Package information is not available while changes are applied")
+            )
+        elif self.current_package:
             if self.active_filter == "desc":
                 self._show_description()
             elif self.active_filter == "updinfo":
@@ -210,7 +368,6 @@ class PackageInfo(PackageDetails):
                 self._show_requirements()
             else:
                 logger.error(f"Package info not found: {self.active_filter}")
-        self.goto_top()
 
     # pylint: disable=method-hidden
     def _url_handler(self, url):
@@ -342,7 +499,9 @@ class PackageInfo(PackageDetails):
     def _show_filelist(self):
         self.base.set_working(True, False)
         filelist = self.current_package.filelist
-        if filelist:
+        if filelist and len(filelist) > const.FILELIST_VIEW_LIMIT:
+            self.write_list(sorted(filelist))
+        elif filelist:
             for fname in sorted(filelist):
                 self.write(fname, "filelist")
         else:
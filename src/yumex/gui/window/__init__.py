@@ -18,7 +18,7 @@
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 
 # pylint: disable=attribute-defined-outside-init
-from gi.repository import Gdk, Gtk  # isort:skip
+from gi.repository import Gdk, GLib, Gtk  # isort:skip
 
 import logging
 import os.path
@@ -80,6 +80,11 @@ class Window(BaseWindow):
         self._grps = None  # Group and Category cache
         self.active_page = "packages"  # Active content page
         self.search_fields = CONFIG.conf.search_fields
+        self._depsolve_timer = None  # pending background depsolve
+        self._depsolve_running = False
+        self._pending_queues = []  # queues waiting for the running transaction
+        # (func, args) to run, when the running background depsolve is done
+        self._after_depsolve = None
 
         if self.install_mode:
             self._setup_gui_installmode()
@@ -242,7 +247,9 @@ class Window(BaseWindow):
     def _setup_action_page(self):
         """Setup Pending Action page."""
         queue_menu = self.get_ui("queue_menu")
-        self.queue_view = QueueView(queue_menu)
+        self.queue_view = QueueView(
+            queue_menu, get_update_set=lambda: self.backend.get_update_set()
+        )
         self.queue_view.connect("queue-refresh", self.on_queue_refresh)
         # Queue Page
         scroll_win = self.get_ui("queue_sw")
@@ -289,6 +296,8 @@ class Window(BaseWindow):
         # so disable the botton
         undo.set_sensitive(False)
         undo.connect("clicked", self.on_history_undo)
+        search = self.get_ui("history_search")
+        search.connect("search-changed", self.on_history_search)
 
     ###############################################################################
     # Helpers
@@ -366,32 +375,101 @@ class Window(BaseWindow):
         self.set_working(False, splash=True)
 
     @common.exception_handler
-    def _reset(self):
-        """Reset the gui on transaction completion."""
+    def _reset(self, clear_queue=True, transaction=None, background=False):
+        """Reset the gui on transaction completion.
+
+        :param clear_queue: clear the package queue
+        :param transaction: the completed transaction, used to update the
+                            package cache, instead of reloading everything
+        :param background: the transaction was running in the background, so
+                           the user can be working on another page.
+        """
         self.set_working(True, splash=True)
         self.infobar.message(_("Reloading package information..."))
         self.release_root_backend()
-        self.backend.reload()
+        self.backend.reload(transaction)
         # clear the package queue
-        self.queue_view.queue.clear()
-        self.queue_view.refresh()
+        if clear_queue:
+            self.queue_view.clear_queue()
+        else:
+            # the queues can contain packages, there is changed by the
+            # transaction or removed from the package cache
+            self._update_queued_packages(self.queue_view.queue)
+            for queue in self._pending_queues:
+                self._update_queued_packages(queue)
+            self.queue_view.refresh()
         # clear search entry
         self.last_search = None
+        self.last_search_pkgs = []
         self.search_bar.reset()
-        # reset groups
+        # mark groups & history as stale, they are reloaded
+        # next time the page is shown (on_page_changed)
         self._grps = None
-        self._load_groups()
-        # reset history
         self.history_view.reset()
-        self._load_history()
         self.set_working(False, splash=True)
-        # show updates
-        self.content.select_page("packages")
-        self.pkg_filter.set_active("updates")
+        if background:
+            # stay on the current page, but show the new package objects
+            self.pkg_filter.set_active(self.pkg_filter.current)
+        else:
+            # show updates
+            self.content.select_page("packages")
+            self.pkg_filter.set_active("updates")
+
+    def _update_queued_packages(self, queue):
+        """Replace the queued packages with the current package objects from
+        the package cache, packages there can't be used for the queued action
+        anymore (ex. installed by the last transaction) is removed.
+        """
+        for action in ("i", "u", "o", "r", "ri"):
+            if queue.packages[action]:
+                # make sure the packages for the action are in the cache
+                flt = "installed" if action == "ri" else const.ACTIONS_FILTER[action]
+                self.backend.get_packages(flt)
+        packages = queue.get()
+        groups = queue.groups
+        queue.clear()
+        queue.groups = groups
+        for action, pkgs in packages.items():
+            for pkg in pkgs:
+                new_pkg = self._get_queued_package(pkg, action)
+                if new_pkg is None:
+                    logger.debug(f"removed from queue : {pkg} ({action})")
+                else:
+                    queue.add(new_pkg, action)
+
+    def _get_queued_package(self, pkg, action):
+        """Get the cached package object for a queued package, None if the
+        action can't be done for the package anymore.
+        """
+        if action == "li":  # local package, not in the cache
+            return pkg
+        cache = self.backend.cache
+        if action == "do":
+            # the queued package is the older version, the installed package
+            # to downgrade must still be installed
+            installed = cache.get(str(pkg.downgrade_po))
+            if installed is None or not installed.installed:
+                return None
+            installed.queued = "do"
+            installed.selected = True
+            installed.downgrade_po = pkg
+            pkg.downgrade_po = installed
+            return pkg
+        new_pkg = cache.get(str(pkg))
+        if new_pkg is None:
+            return None
+        if action in ("r", "ri"):
+            if not new_pkg.installed:
+                return None
+        elif new_pkg.action != action:
+            return None
+        new_pkg.queued = action
+        new_pkg.selected = True
+        return new_pkg
 
     def _load_groups(self):
         """Load groups into group cache and populate group view."""
-        if not self._grps:
+        if not self._grps and not self.transaction_running:
             logger.debug("getting group and categories")
             self._grps = self.backend.get_groups()
             self.groups.populate(self._grps)
@@ -399,9 +477,8 @@ class Window(BaseWindow):
 
     def _load_history(self):
         """Load history and populate view."""
-        if not self.history_view.is_populated:
-            result = self.backend.GetHistoryByDays(0, CONFIG.conf.history_days)
-            self.history_view.populate(result)
+        if not self.history_view.is_populated and not self.transaction_running:
+            self.history_view.load(CONFIG.conf.history_days)
 
     def _refresh(self):
         """Refresh package view, when arch filter is changed"""
@@ -411,6 +488,17 @@ class Window(BaseWindow):
         else:
             self.pkg_filter.set_active(self.pkg_filter.current)
 
+    def _check_transaction_running(self):
+        """Tell the user, if an action must wait for the running transaction"""
+        if self.transaction_running:
+            dialogs.show_information(
+                self,
+                _("Changes are being applied to the system"),
+                _("Please wait until the current transaction is completed"),
+            )
+            return True
+        return False
+
     def _switch_to(self, page):
         if not self.active_page == page:
             self.content.select_page(page)
@@ -441,12 +529,20 @@ class Window(BaseWindow):
         if action:
             self._process_actions_installmode(action, package, args.yes, quit_app)
 
-    def _populate_transaction(self):
+    def _populate_transaction(self, queue):
+        self.backend.clear_resolved()
         self.backend.ClearTransaction()
         errors = 0
         error_msgs = []
+        if queue.is_update_all(self.backend.get_update_set()):
+            # the whole update set is queued, so let dnf update everything,
+            # instead of adding the updates one by one
+            logger.debug("adding: all available updates")
+            txmbrs = self.backend.Update("*")
+            logger.debug(f"txmbrs: {str(txmbrs)}")
+            return
         for action, pkg_type in const.QUEUE_PACKAGE_TYPES.items():
-            pkgs = self.queue_view.queue.get(action)
+            pkgs = queue.get(action)
             for pkg in pkgs:
                 if action == "do":
                     logger.debug(f"adding: {pkg_type} {pkg.pkg_id}")
@@ -462,7 +558,7 @@ class Window(BaseWindow):
                         logger.debug(f"result: {rc}: {pkg}")
                         errors += 1
                         error_msgs.append(f"{pkg_type} : {pkg}")
-        for grp_id, action in self.queue_view.queue.get_groups():
+        for grp_id, action in queue.get_groups():
             if action == "i":
                 rc, msgs = self.backend.GroupInstall(grp_id)
                 logger.debug(f"GroupInstall : {grp_id} {rc=} {msgs=}")
@@ -491,18 +587,24 @@ class Window(BaseWindow):
                         protected.append(n)
         return protected
 
-    def _build_from_queue(self):
+    def _build_from_queue(self, queue):
         """Populate transaction from queue and resolve deps."""
         # switch to queue view
-        if self.queue_view.queue.total() == 0:
+        if queue.total() == 0:
             raise common.QueueEmptyError
         self.content.select_page("actions")
-        self._populate_transaction()
+        fingerprint = queue.fingerprint()
+        result = self.backend.get_resolved(fingerprint)
+        if result is not None:
+            logger.debug(f"reusing resolved transaction : {fingerprint}")
+            return result
+        self._populate_transaction(queue)
         self.infobar.message(_("Searching for dependencies"))
         rc, result = self.backend.BuildTransaction()
         self.infobar.message(_("Dependencies resolved"))
         if not rc:
             raise common.TransactionSolveError(result)
+        self.backend.set_resolved(fingerprint, result)
         return result
 
     def _get_transaction(self):
@@ -513,10 +615,21 @@ class Window(BaseWindow):
             raise common.TransactionSolveError(result)
         return result
 
-    def _run_transaction(self):
-        """Run the current transaction."""
+    def _run_transaction(self, queue, transaction):
+        """Run the current transaction.
+
+        :param queue: the queue, the transaction was build from
+        :param transaction: the resolved transaction
+        """
+        background = CONFIG.conf.background_transactions
         self.infobar.message(common._("Applying changes to the system"))
-        self.set_working(True, True, splash=True)
+        if background:
+            # keep the gui usable, while the transaction is running
+            self._set_transaction_running(True)
+        else:
+            self.set_working(True, True, splash=True)
+        # the transaction is consumed by the daemon
+        self.backend.clear_resolved()
         rc, result = self.backend.RunTransaction()
         logger.debug(f"RunTransaction : {rc=}")
         # This can happen more than once (more gpg keys to be
@@ -534,7 +647,7 @@ class Window(BaseWindow):
                     # rerun the transaction
                     # FIXME: It should not be needed to populate
                     # the transaction again
-                    self._populate_transaction()
+                    self._populate_transaction(queue)
                     rc, result = self.backend.BuildTransaction()
                     rc, result = self.backend.RunTransaction()
                 else:
@@ -545,12 +658,16 @@ class Window(BaseWindow):
                 )
                 break
 
+        if background:
+            self._set_transaction_running(False)
         if rc == 4:  # Download errors
             dialogs.show_information(
                 self,
                 ngettext("Downloading error\n", "Downloading errors\n", len(result)),
                 "\n".join(result),
             )
+            # keep the queue, so it can be applied again
+            self._restore_queue(queue)
             self._reset_on_cancel()
             return
         elif rc != 0:  # other transaction errors
@@ -561,9 +678,56 @@ class Window(BaseWindow):
                 ),
                 "\n".join(result),
             )
-        self._reset()
+            # we don't know what was changed, so reload everything
+            transaction = None
+        # in background mode, the queue in the view is a new one
+        self._reset(
+            clear_queue=not background, transaction=transaction, background=background
+        )
         return
 
+    def _set_transaction_running(self, state):
+        """Set the state of a transaction running in the background."""
+        self.transaction_running = state
+        self.backend.transaction_running = state
+        if state:
+            self.infobar.message_sub(_("You can continue working, while waiting"))
+
+    def _queue_transaction(self):
+        """Move the current queue to the transaction pipeline.
+
+        It will be processed, when the running transaction is completed
+        """
+        queue = self.queue_view.queue
+        if queue.total() == 0:
+            return
+        self._pending_queues.append(queue.copy())
+        self.queue_view.clear_queue()
+        self.package_view.queue_draw()
+        self.group_package_view.queue_draw()
+        num = len(self._pending_queues)
+        logger.debug(f"transaction queued, pending transactions : {num}")
+        self.infobar.message_sub(
+            ngettext("%d transaction is waiting", "%d transactions are waiting", num)
+            % num
+        )
+
+    def _restore_queue(self, queue):
+        """Put a queue, there was not applied, back into the queue view,
+        if it was taken out of the view (background transactions).
+        """
+        if queue is not self.queue_view.queue:
+            self.queue_view.restore_queue(queue)
+            self.package_view.queue_draw()
+            self.group_package_view.queue_draw()
+
+    def _run_next_transaction(self):
+        """Process the next transaction in the pipeline."""
+        if self._pending_queues and not self.transaction_running:
+            queue = self._pending_queues.pop(0)
+            self._process_actions(queue=queue)
+        return False
+
     @common.exception_handler
     def _process_actions_installmode(self, action, package, always_yes, app_quit):
         """Process the pending actions from the command line.
@@ -573,6 +737,7 @@ class Window(BaseWindow):
         :param always_yes: ask the user or default to yes/ok to all questions
         """
         exit_msg = ""
+        self.backend.clear_resolved()
         if action == "install":
             self.infobar.message(_("Installing package: %s") % package)
             exit_msg = _("%s was installed successfully") % package
@@ -615,11 +780,11 @@ class Window(BaseWindow):
                 "\n".join(result),
             )
         if app_quit:
-            self.release_root_backend(quit_dnfdaemon=True)
+            self.close_root_backend()
             self.app.quit()
 
     @common.exception_handler
-    def _process_actions(self, from_queue=True):
+    def _process_actions(self, from_queue=True, queue=None):
         """Process the current actions in the queue.
 
         - setup the Dnf transaction
@@ -627,11 +792,34 @@ class Window(BaseWindow):
         - ask user for confirmation on result of depsolve
         - run the transaction
         """
+        if self.transaction_running:
+            # process the queue, when the running transaction is done
+            if from_queue and queue is None:
+                self._queue_transaction()
+            return
+        if self._depsolve_running:
+            # we are called from the nested main loop of the background
+            # depsolve, so wait for it to return, before using the daemon
+            self._run_after_depsolve(self._process_actions, from_queue, queue)
+            return
+        try:
+            self._apply_actions(from_queue, queue)
+        finally:
+            # start the next queued transaction, when we are completely done
+            # here, also if this one was cancelled or failed.
+            if self._pending_queues:
+                GLib.idle_add(self._run_next_transaction)
+
+    def _apply_actions(self, from_queue, queue):
+        """Build, confirm and run a transaction (see _process_actions)."""
+        if queue is None:
+            queue = self.queue_view.queue
+        self._cancel_background_depsolve()
         self.set_working(True, True)
         self.infobar.message(_("Preparing system for applying changes"))
         try:
             if from_queue:
-                result = self._build_from_queue()
+                result = self._build_from_queue(queue)
             else:
                 result = self._get_transaction()
             self.set_working(False)
@@ -646,14 +834,26 @@ class Window(BaseWindow):
                     )
                     + common.list_to_string(check, "\n ", ",\n ")
                 )
+                self._restore_queue(queue)
                 self._reset_on_cancel()
                 return
             # transaction confirmation dialog
+            # NOTE: the packages can't be downloaded while the dialog is open,
+            # dnfdaemon (api version 2) only downloads packages as part of
+            # RunTransaction, there also applies the changes to the system.
             self.transaction_result.populate(result, "")
             ok = self.transaction_result.run()
             if ok:  # Ok pressed
-                self._run_transaction()
+                if (
+                    CONFIG.conf.background_transactions
+                    and queue is self.queue_view.queue
+                ):
+                    # free the queue view, so a new queue can be build
+                    queue = queue.copy()
+                    self.queue_view.clear_queue()
+                self._run_transaction(queue, result)
             else:  # user cancelled transaction
+                self._restore_queue(queue)
                 self._reset_on_cancel()
                 return
         except common.QueueEmptyError:  # Queue is empty
@@ -670,6 +870,7 @@ class Window(BaseWindow):
                 )
                 + "\n".join(e.msgs)
             )
+            self._restore_queue(queue)
             self._reset_on_cancel()
         except common.TransactionSolveError as e:
             self.error_dialog.show(
@@ -680,8 +881,72 @@ class Window(BaseWindow):
                 )
                 + "\n".join(e.msgs)
             )
+            self._restore_queue(queue)
             self._reset_on_error()
 
+    def _schedule_background_depsolve(self):
+        """(Re)start the background depsolve timer, so rapid queue changes
+        only trigger a single depsolve.
+        """
+        self._cancel_background_depsolve()
+        self._depsolve_timer = GLib.timeout_add(
+            const.BACKGROUND_DEPSOLVE_DELAY, self._on_background_depsolve
+        )
+
+    def _cancel_background_depsolve(self):
+        if self._depsolve_timer:
+            GLib.source_remove(self._depsolve_timer)
+            self._depsolve_timer = None
+
+    def _run_after_depsolve(self, func, *args):
+        """Run an action there uses the daemon, when the running background
+        depsolve is completed.
+        """
+        logger.debug(f"waiting for background depsolve : {func.__name__}")
+        self._after_depsolve = (func, args)
+
+    def _on_after_depsolve(self):
+        if self._after_depsolve:
+            func, args = self._after_depsolve
+            self._after_depsolve = None
+            func(*args)
+        return False
+
+    @common.exception_handler
+    def _on_background_depsolve(self):
+        """Resolve the current queue and cache the result for Apply."""
+        self._depsolve_timer = None
+        queue = self.queue_view.queue
+        if queue.total() == 0:
+            return False
+        if self.is_working or self.transaction_running:  # try again, when idle
+            self._schedule_background_depsolve()
+            return False
+        fingerprint = queue.fingerprint()
+        if self.backend.get_resolved(fingerprint) is not None:
+            return False
+        logger.debug(f"background depsolve : {fingerprint}")
+        self._depsolve_running = True
+        try:
+            self._populate_transaction(queue)
+            # the transaction in the daemon can be replaced (ex. by a history
+            # undo), while the nested BuildTransaction call is running
+            generation = self.backend.resolved_generation
+            rc, result = self.backend.BuildTransaction()
+        except common.TransactionBuildError:
+            # Apply will build the transaction again and report the errors
+            rc, result = False, None
+        finally:
+            self._depsolve_running = False
+            if self._after_depsolve:  # run it, when we have returned
+                GLib.idle_add(self._on_after_depsolve)
+        # the queue could have changed while it was being resolved
+        if rc and queue.fingerprint() == fingerprint:
+            self.backend.set_resolved(fingerprint, result, generation)
+        else:
+            logger.debug("background depsolve result discarded")
+        return False
+
     ###############################################################################
     # Callback handlers
     ###############################################################################
@@ -732,6 +997,8 @@ class Window(BaseWindow):
 
     def on_mainmenu(self, widget, action, data):
         """Handle mainmenu actions"""
+        if action in ("pref", "reload") and self._check_transaction_running():
+            return
         if action == "pref":
             need_reset = self.preferences.run()
             if need_reset:
@@ -785,6 +1052,8 @@ class Window(BaseWindow):
 
     def on_search(self, widget, key, sch_type, fields):
         """Handle search."""
+        if key != "" and self._check_transaction_running():
+            return
         self.search_bar.show_spinner(True)
         if key == "":  # revert to the current selected filter
             self.last_search = None
@@ -832,8 +1101,11 @@ class Window(BaseWindow):
         """Handle content of the queue is changed."""
         if total > 0:
             self.apply_button.set_sensitive(True)
+            if CONFIG.conf.background_depsolve:
+                self._schedule_background_depsolve()
         else:
             self.apply_button.set_sensitive(False)
+            self._cancel_background_depsolve()
 
     def on_pkg_view_selection_changed(self, widget, pkg):
         """Handle package selection on package page."""
@@ -846,15 +1118,31 @@ class Window(BaseWindow):
     def on_group_changed(self, widget, grp_id):
         """Handle group selection on group page."""
         logger.debug(f"on_group_changed : {grp_id}")
+        if self.transaction_running:
+            return
         self.set_working(True, True)
         pkgs = self.backend.get_group_packages(grp_id, "all")
         self.group_package_view.populate(pkgs)
         self.set_working(False)
 
+    def on_history_search(self, widget):
+        """Handle search for a package in the history."""
+        self.history_view.search(widget.get_text().strip())
+
     def on_history_undo(self, widget):
         """Handle the undo button on history page."""
+        if self._check_transaction_running():
+            return
         tid = self.history_view.get_selected()
+        self._history_undo(tid)
+
+    def _history_undo(self, tid):
+        """Undo a history transaction."""
+        if self._depsolve_running:
+            self._run_after_depsolve(self._history_undo, tid)
+            return
         logger.debug(f"History Undo : {tid}")
+        self.backend.clear_resolved()
         rc, messages = self.backend.HistoryUndo(tid)
         if rc:
             self._process_actions(from_queue=False)
@@ -25,9 +25,9 @@ import re
 import sys
 
 import yumex.common.const as const
-import yumex.common as common
 
 from yumex.common import CONFIG
+from yumex.gui import check_dark_theme, do_gtk_events
 from yumex.gui.dialogs.errordialog import ErrorDialog
 from yumex.gui.dialogs.transactionresult import TransactionResult
 
@@ -63,14 +63,14 @@ class BaseWindow(Gtk.ApplicationWindow, BaseYumex):
 
     def can_close(self):
         """Check if yumex is idle and can be closed"""
-        if self.is_working:
+        if self.is_working or self.transaction_running:
             return False
         else:
             return True
 
     # noinspection PyUnusedLocal
     def on_delete_event(self, *_args):
-        if self.is_working:
+        if self.is_working or self.transaction_running:
             self.iconify()
             return True
         else:
@@ -98,7 +98,7 @@ class BaseWindow(Gtk.ApplicationWindow, BaseYumex):
             "color_obsolete",
         ]
         regex = re.compile(r"@define-color\s(\w*)\s*(#\w{6}|@\w*)\s*;")
-        if common.check_dark_theme():
+        if check_dark_theme():
             color_bak = "#ffffff"
         else:
             color_bak = "#000000"
@@ -219,7 +219,9 @@ class BaseWindow(Gtk.ApplicationWindow, BaseYumex):
             if insensitive:
                 self._disable_buttons(False)
         else:
-            self.infobar.hide()
+            # keep showing the progress of a background transaction
+            if not self.transaction_running:
+                self.infobar.hide()
             self._set_normal_cursor()
             if splash and CONFIG.conf.show_splash:
                 self.working_splash.hide()
@@ -241,11 +243,11 @@ class BaseWindow(Gtk.ApplicationWindow, BaseYumex):
         win = self.get_window()
         if win is not None:
             win.set_cursor(Gdk.Cursor(Gdk.CursorType.WATCH))
-        common.do_gtk_events()
+        do_gtk_events()
 
     def _set_normal_cursor(self):
         """Set Normal cursor in main window."""
         win = self.get_window()
         if win is not None:
             win.set_cursor(None)
-        common.do_gtk_events()
+        do_gtk_events()
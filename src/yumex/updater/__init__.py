@@ -26,19 +26,39 @@
 
 from signal import SIGINT, SIGTERM, SIGHUP
 
+import fcntl
+import json
 import logging
 import os
+import random
+import re
+import resource
+import stat
 import sys
+import tempfile
 import time
 
 from xdg import BaseDirectory
 import dnfdaemon.client
 from yumex.common import _, ngettext, CONFIG
+from yumex.common.cache import (
+    ATTRIBUTE_CACHE_FILE,
+    AttributeCache,
+    get_cache_file,
+)
+from yumex.common.markers import (
+    DNF_CACHE_DIR,
+    RPMDB_DIRS,
+    get_markers,
+    get_metadata_age,
+    load_updates,
+    save_updates,
+)
 import yumex.common as common
 
 import gi
 
-gi.require_version("Gtk", "3.0")
+# only the things used by the updater is loaded (no Gtk)
 gi.require_version("Notify", "0.7")
 from gi.repository import Gio, Notify, GObject, GLib  # noqa: E402
 
@@ -54,6 +74,13 @@ YUMEX_BIN = "/usr/bin/yumex-dnf"
 CONF_DIR = BaseDirectory.save_config_path("yumex-dnf")
 TIMESTAMP_FILE = os.path.join(CONF_DIR, "update_timestamp.conf")
 DELAYED_START = 5 * 60  # Seconds before first check
+UPDATE_JITTER = 10 * 60  # Max. random seconds added to the check time
+RETRY_DELAY = 60  # Seconds before the first retry, when the daemon is busy
+MONITOR_DELAY = 30  # Seconds from a rpmdb/dnf cache change to it is checked
+SHARED_DIR = "/var/tmp/yumex-dnf"  # machine wide update check results
+UPDATEINFO_BATCH = 20  # Max. updateinfo fetched, while holding the daemon lock
+UPDATEINFO_DELAY = 5  # Seconds between the updateinfo batches
+DNFDAEMON_BUS_NAME = "org.baseurl.DnfSystem"
 
 
 class _Notification(GObject.GObject):
@@ -119,15 +146,288 @@ class _UpdateTimestamp:
         self.__last_time = now
 
 
+class _SharedCheck:
+    """
+    update check shared by all users on the machine.
+
+    The result of a check is written to a world readable file in a root owned
+    sticky directory (created by systemd-tmpfiles), one file per user (a user
+    can't replace the files of others in a sticky directory). A result file is
+    only used, if it is owned by the user in the file name.
+    NOTE: the users trust each other, any user on the machine can publish a
+    (fake) result for the current markers, there is used by the other users.
+    Only one user is doing the check at the time, the others use the newest
+    result, there is valid for the current rpmdb/metadata markers.
+    """
+
+    RESULT_FILE_RE = re.compile(r"^updates-(\d+)\.json$")
+
+    def __init__(self, shared_dir=SHARED_DIR):
+        self.__dir = shared_dir
+        self.__lock_file = os.path.join(shared_dir, "check.lock")
+        self.__result_file = os.path.join(shared_dir, f"updates-{os.getuid()}.json")
+
+    def __is_usable(self):
+        """
+        check the shared directory is a root owned sticky directory, else the
+        owner of the directory can replace the files of the other users
+        """
+        try:
+            dir_stat = os.lstat(self.__dir)
+        except OSError as err:
+            logger.debug(f"Shared update check is not available : {err}")
+            return False
+        if (
+            stat.S_ISDIR(dir_stat.st_mode)
+            and dir_stat.st_uid == 0
+            and stat.S_IMODE(dir_stat.st_mode) == 0o1777
+        ):
+            return True
+        logger.debug(f"{self.__dir} is not a root owned sticky directory")
+        return False
+
+    @staticmethod
+    def __read_result(path, uid):
+        """read a result file, if it is a regular file owned by uid"""
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK)
+        except OSError as err:
+            logger.debug(f"could not read {path} : {err}")
+            return None
+        with os.fdopen(fd, "r", encoding="UTF-8") as in_file:
+            file_stat = os.fstat(fd)
+            if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_uid != uid:
+                logger.debug(f"{path} is not owned by {uid}, not used")
+                return None
+            try:
+                data = json.load(in_file)
+            except ValueError as err:
+                logger.debug(f"could not read {path} : {err}")
+                return None
+        if not isinstance(data, dict) or not isinstance(data.get("updates"), list):
+            return None
+        return data
+
+    def read(self, markers):
+        """
+        get the newest shared result for the markers, there is newer than
+        update_interval, returns (updates, security_count) or None
+        updates is a list of [pkg_id, summary, size], security_count is None
+        if it is not in the result.
+        """
+        if not self.__is_usable():
+            return None
+        try:
+            file_names = os.listdir(self.__dir)
+        except OSError as err:
+            logger.debug(f"could not read {self.__dir} : {err}")
+            return None
+        now = time.time()
+        newest = None
+        for file_name in file_names:
+            match = self.RESULT_FILE_RE.match(file_name)
+            if not match:
+                continue
+            data = self.__read_result(
+                os.path.join(self.__dir, file_name), int(match.group(1))
+            )
+            if data is None or data.get("markers") != markers:
+                continue
+            timestamp = data.get("timestamp")
+            # a result from the future would be valid forever
+            if not isinstance(timestamp, (int, float)) or timestamp > now:
+                continue
+            if newest is None or timestamp > newest["timestamp"]:
+                newest = data
+        if newest and now - newest["timestamp"] < CONFIG.conf.update_interval * 60:
+            security_count = newest.get("security")
+            if not isinstance(security_count, int):
+                security_count = None
+            return newest["updates"], security_count
+        return None
+
+    def publish(self, markers, result):
+        """share a result, there is completed after the check"""
+        if self.__is_usable():
+            self.__write(markers, result)
+
+    def __write(self, markers, result):
+        """write the result to a new file, there replaces our result file"""
+        updates, security_count = result
+        # the other users don't have the updateinfo to count it themselves
+        data = {
+            "markers": markers,
+            "timestamp": time.time(),
+            "updates": updates,
+            "security": security_count,
+        }
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=".updates-", suffix=".tmp", dir=self.__dir
+            )
+        except OSError as err:
+            logger.debug(f"Could not share update check result : {err}")
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="UTF-8") as out_file:
+                os.fchmod(out_file.fileno(), 0o644)
+                json.dump(data, out_file)
+            os.replace(tmp_path, self.__result_file)
+        except OSError as err:
+            logger.debug(f"Could not share update check result : {err}")
+            os.unlink(tmp_path)
+
+    def get_updates(self, markers, check):
+        """
+        get the updates from a shared result or by doing the check
+        if no one else is checking.
+
+        :param markers: current rpmdb/metadata markers
+        :param check: function to do the check, returns
+                      (updates, security_count) or None
+        :return: (updates, security_count) or None
+        """
+        result = self.read(markers)
+        if result is not None:
+            logger.debug("Using shared update check result")
+            return result
+        if not self.__is_usable():
+            return check()
+        # the lock file is created by systemd-tmpfiles, so it is usable by all
+        # users (no O_CREAT, it fails with fs.protected_regular, if the file is
+        # created by another user)
+        try:
+            lock_fd = os.open(self.__lock_file, os.O_RDWR | os.O_NOFOLLOW)
+        except OSError as err:
+            logger.debug(f"Could not open {self.__lock_file} : {err}")
+            return check()
+        if os.fstat(lock_fd).st_uid != 0:
+            os.close(lock_fd)
+            logger.debug(f"{self.__lock_file} is not owned by root")
+            return check()
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_fd)
+            logger.debug("Another user is checking for updates")
+            return None
+        try:
+            # the check can have been done, while we were waiting
+            result = self.read(markers)
+            if result is None:
+                result = check()
+                if result is not None:
+                    self.__write(get_markers(), result)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+        return result
+
+
+class _Metrics:
+    """
+    update check metrics, written as a node_exporter textfile collector file
+    after each check, so the update state can be monitored for many machines.
+    """
+
+    def __init__(self):
+        self.update_count = -1
+        self.security_count = 0
+        self.check_duration = 0.0
+        self.lock_wait = 0.0
+        self.daemon_errors = 0
+        self.last_success = 0.0
+
+    def __format(self):
+        label = f'{{uid="{os.getuid()}"}}'
+        metrics = (
+            (
+                "yumex_updates_available",
+                "gauge",
+                "Number of available updates (-1 if the check failed)",
+                self.update_count,
+            ),
+            (
+                "yumex_security_updates_available",
+                "gauge",
+                "Number of available security updates",
+                self.security_count,
+            ),
+            (
+                "yumex_update_check_duration_seconds",
+                "gauge",
+                "Duration of the last update check",
+                self.check_duration,
+            ),
+            (
+                "yumex_update_lock_wait_seconds",
+                "gauge",
+                "Time from the first failed dnfdaemon lock attempt (retries"
+                " included) to the lock was taken in the last check",
+                self.lock_wait,
+            ),
+            (
+                "yumex_update_daemon_errors_total",
+                "counter",
+                "Number of failed dnfdaemon update checks",
+                self.daemon_errors,
+            ),
+            (
+                "yumex_update_last_success_timestamp_seconds",
+                "gauge",
+                "Time of the last successful update check",
+                self.last_success,
+            ),
+        )
+        lines = []
+        for name, kind, text, value in metrics:
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{label} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """write the metrics, the file is replaced atomically"""
+        # the collector only reads *.prom files, so it never sees the tmp file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="UTF-8") as out_file:
+                out_file.write(self.__format())
+            os.replace(tmp_path, path)
+        except OSError as err:
+            logger.debug(f"Could not write metrics to {path} : {err}")
+
+
 class _Updater:
     def __init__(self):
         # update checking
         self.__update_timer_id = -1
         self.__update_timestamp = _UpdateTimestamp()
-        self.__next_update = 0
-        self.__last_timestamp = 0
+        self.__monitor_timer_id = -1
+        self.__monitors = []
+        self.__exit_timer_id = -1
+        self.__shared_check = _SharedCheck()
+        self.__retry_count = 0
+        # first lock attempt, kept across the retries until the lock is taken
+        self.__lock_wait_start = None
+        self.__security_count = 0
+        self.__metrics = _Metrics()
+        # updateinfo for the updates, so it is only fetched once per package
+        self.__attr_cache = AttributeCache(
+            get_cache_file(ATTRIBUTE_CACHE_FILE),
+            CONFIG.conf.attribute_cache_size * 1024 * 1024,
+        )
+        # updates there is missing updateinfo for, fetched in batches
+        self.__updateinfo_ids = []
+        self.__updateinfo_pkgs = None
+        self.__updateinfo_markers = None
+        self.__updateinfo_timer_id = -1
         self.__mute_count = 0
         self.__last_num_updates = 0
+        # rpmdb/metadata state markers and result of the last daemon check
+        self.__markers = None
+        self.__markers_time = 0
+        self.__update_count = -1
 
         # dnfdaemon client setup
         try:
@@ -138,30 +438,236 @@ class _Updater:
             common.notify(f"Error starting dnfdaemon service\n\n{msg}", msg)
             sys.exit(1)
 
+    def __is_unchanged(self, markers):
+        """
+        check if the rpmdb and repo metadata are the same as in the last check
+        (or the last check in an earlier session).
+        the daemon is still asked, if both the metadata and the last check are
+        older than refresh_interval, because the daemon can refresh it.
+        """
+        if self.__update_count < 0 or markers != self.__markers:
+            updates = load_updates(markers)
+            if updates is None:
+                return False
+            self.__markers = markers
+            self.__markers_time = 0
+            self.__update_count = len(updates)
+            self.__security_count = self.__get_security_count(updates)
+        refresh = CONFIG.conf.refresh_interval * 3600
+        if time.time() - self.__markers_time < refresh:
+            return True
+        metadata_age = get_metadata_age(markers)
+        return metadata_age is not None and metadata_age < refresh
+
+    def __check_daemon(self):
+        """
+        get the updates from the daemon
+        returns (updates, security_count) or None on error, updates is a list
+        of [pkg_id, summary, size] and security_count is None, if the
+        updateinfo is not fetched yet.
+        """
+        if self.__lock_wait_start is None:
+            self.__lock_wait_start = time.monotonic()
+        try:
+            locked = self.__backend.Lock()
+            self.__metrics.lock_wait = time.monotonic() - self.__lock_wait_start
+            if locked:
+                self.__lock_wait_start = None
+                try:
+                    if CONFIG.conf.daemon_keepalive > 0:
+                        # the daemon is closed by the keep-alive timer
+                        self.__backend.SetWatchdogState(False)
+                    # there is no api for getting only the number of updates
+                    pkgs = self.__backend.GetPackages("updates", ["summary", "size"])
+                finally:
+                    self.__backend.Unlock()
+                logger.debug(f"#Number of updates : {len(pkgs)}")
+                # so yumex can show the updates, without asking the daemon
+                # the daemon can have refreshed the metadata, while checking
+                markers = get_markers()
+                save_updates(markers, pkgs)
+                self.schedule_daemon_exit()
+                self.__updateinfo_markers = markers
+                return pkgs, self.__get_security_count(pkgs)
+            logger.debug("Could not get the dnfdaemon lock")
+        except dnfdaemon.client.DaemonError as err:
+            logger.debug(f"Error checking for updates : {err}")
+        self.__metrics.daemon_errors += 1
+        return None
+
+    def __get_security_count(self, pkgs):
+        """
+        count the security updates, returns None if the updateinfo is not
+        cached for all updates, then it is fetched in the background and the
+        notification is shown, when it is done.
+        """
+        missing = [
+            pkg_id
+            for pkg_id, _summary, _size in pkgs
+            if self.__attr_cache.get(pkg_id, "updateinfo") is None
+        ]
+        if not missing:
+            self.__updateinfo_pkgs = None
+            return self.__count_security(pkgs)
+        logger.debug(f"fetching updateinfo for {len(missing)} updates")
+        self.__updateinfo_ids = missing
+        self.__updateinfo_pkgs = pkgs
+        if self.__updateinfo_timer_id == -1:
+            self.__updateinfo_timer_id = GObject.timeout_add_seconds(
+                UPDATEINFO_DELAY, self.__on_fetch_updateinfo
+            )
+        return None
+
+    def __on_fetch_updateinfo(self):
+        """
+        get the updateinfo for the next batch of updates.
+        there is no api to get it for all updates at once, so the daemon lock
+        is only hold for UPDATEINFO_BATCH packages at a time, so yumex can get
+        it in between. the updateinfo for a package never changes, so it is
+        only fetched once.
+        """
+        self.__updateinfo_timer_id = -1
+        try:
+            locked = self.__backend.Lock()
+        except dnfdaemon.client.DaemonError as err:
+            logger.debug(f"Error getting the dnfdaemon lock : {err}")
+            locked = False
+        if not locked:
+            # yumex can hold the lock for a long time, so the notification is
+            # shown without the security count and the rest is fetched later
+            logger.debug("dnfdaemon is busy, fetching updateinfo in the next check")
+            pkgs = self.__updateinfo_pkgs
+            self.__updateinfo_pkgs = None
+            if pkgs is not None:
+                self.__notify(len(pkgs), None)
+            return False
+        batch = self.__updateinfo_ids[:UPDATEINFO_BATCH]
+        del self.__updateinfo_ids[:UPDATEINFO_BATCH]
+        try:
+            for pkg_id in batch:
+                try:
+                    updinfo = self.__backend.GetAttribute(pkg_id, "updateinfo")
+                except dnfdaemon.client.DaemonError as err:
+                    # the package is counted as not being a security update
+                    logger.debug(f"Could not get updateinfo for {pkg_id} : {err}")
+                    continue
+                self.__attr_cache.put(pkg_id, "updateinfo", updinfo or [])
+        finally:
+            try:
+                self.__backend.Unlock()
+            except dnfdaemon.client.DaemonError as err:
+                logger.debug(f"Error releasing the dnfdaemon lock : {err}")
+        if self.__updateinfo_ids:
+            self.__updateinfo_timer_id = GObject.timeout_add_seconds(
+                UPDATEINFO_DELAY, self.__on_fetch_updateinfo
+            )
+        else:
+            self.__on_updateinfo_done()
+        return False
+
+    def __on_updateinfo_done(self):
+        """count the security updates and show the delayed notification"""
+        pkgs = self.__updateinfo_pkgs
+        self.__updateinfo_pkgs = None
+        if pkgs is None:
+            return
+        security_count = self.__count_security(pkgs)
+        logger.debug(f"updateinfo fetched, # security updates = {security_count}")
+        self.__security_count = security_count
+        markers = self.__updateinfo_markers
+        self.__updateinfo_markers = None
+        if CONFIG.conf.shared_update_check and markers == get_markers():
+            # the other users don't have the updateinfo to count it themselves
+            self.__shared_check.publish(markers, (pkgs, security_count))
+        if CONFIG.conf.metrics_file:
+            self.__metrics.security_count = security_count
+            self.__metrics.write(CONFIG.conf.metrics_file)
+        self.__notify(len(pkgs), security_count)
+
+    def __count_security(self, pkgs):
+        """count the updates with a security advisory (cached updateinfo)"""
+        if not pkgs:
+            return 0
+        import hawkey  # only needed, when there are updates
+
+        count = 0
+        for pkg_id, _summary, _size in pkgs:
+            updinfo = self.__attr_cache.get(pkg_id, "updateinfo") or []
+            if any(adv["type"] == hawkey.ADVISORY_SECURITY for adv in updinfo):
+                count += 1
+        return count
+
     def __get_updates(self):
         logger.debug("Checking for updates")
-        if self.__backend.Lock():
-            pkgs = self.__backend.GetPackages("updates")
-            update_count = len(pkgs)
-            self.__backend.Unlock()
-            logger.debug(f"#Number of updates : {update_count}")
+        check_start = time.monotonic()
+        self.__metrics.lock_wait = 0.0
+        markers = get_markers()
+        if self.__is_unchanged(markers):
+            update_count = self.__update_count
+            logger.debug(f"Nothing has changed, #Number of updates : {update_count}")
         else:
-            logger.debug("Could not get the dnfdaemon lock")
-            update_count = -1
+            # only a result from our own check is shared again with the count
+            self.__updateinfo_markers = None
+            if CONFIG.conf.shared_update_check:
+                result = self.__shared_check.get_updates(markers, self.__check_daemon)
+            else:
+                result = self.__check_daemon()
+            self.__markers = get_markers()
+            self.__markers_time = time.time()
+            if result is None:
+                update_count = -1
+                self.__security_count = 0
+            else:
+                pkgs, security_count = result
+                update_count = len(pkgs)
+                if security_count is None:
+                    # the updateinfo is not fetched yet (or the shared result
+                    # is from an older version)
+                    security_count = self.__get_security_count(pkgs)
+                self.__security_count = security_count
+            self.__update_count = update_count
+        security_count = self.__security_count
+        self.__write_metrics(update_count, security_count, check_start)
+        if security_count is None:
+            # a security count is not known yet, notify when it is
+            logger.debug("notification waits for the updateinfo")
+        else:
+            self.__notify(update_count, security_count)
+        if update_count == -1:
+            # the daemon (or the shared check) is busy, try again soon
+            self.__schedule_retry()
+        else:
+            self.__retry_count = 0
+            self.__lock_wait_start = None
+            self.__update_timestamp.store_current_time()
+            self.start_update_timer()  # restart update timer if necessary
+        return update_count
+
+    def __notify(self, update_count, security_count):
+        """show a notification about the available updates"""
         if update_count > 0:
             if self.__mute_count < 1:
                 # Only show the same notification once
                 # until the user closes the notification
                 if update_count != self.__last_num_updates:
-                    logger.debug(f"notification opened : # updates = {update_count}")
-                    notify = _Notification(
-                        _("New Updates"),
+                    logger.debug(
+                        f"notification opened : # updates = {update_count}"
+                        f" (security = {security_count})"
+                    )
+                    body = (
                         # Translators: %d is a number of available updates
                         ngettext(
                             "%d available update", "%d available updates", update_count
                         )
-                        % update_count,
+                        % update_count
                     )
+                    if security_count:
+                        body += " " + (
+                            # Translators: %d is a number of security updates
+                            ngettext("(%d security)", "(%d security)", security_count)
+                            % security_count
+                        )
+                    notify = _Notification(_("New Updates"), body)
                     notify.connect("notify-action", self.__on_notify_action)
                     notify.show()
                     self.__last_num_updates = update_count
@@ -172,9 +678,95 @@ class _Updater:
                 logger.debug(
                     f"skipping notification : mute_count = {self.__mute_count}"
                 )
-        self.__update_timestamp.store_current_time()
-        self.start_update_timer()  # restart update timer if necessary
-        return update_count
+
+    def __write_metrics(self, update_count, security_count, check_start):
+        """write the metrics for the check, if a metrics_file is configured"""
+        if not CONFIG.conf.metrics_file:
+            return
+        metrics = self.__metrics
+        metrics.update_count = update_count
+        metrics.security_count = security_count or 0
+        metrics.check_duration = time.monotonic() - check_start
+        if update_count != -1:
+            metrics.last_success = time.time()
+        metrics.write(CONFIG.conf.metrics_file)
+
+    def __schedule_retry(self):
+        """retry the update check with exponential backoff"""
+        if self.__update_timer_id != -1:
+            GObject.source_remove(self.__update_timer_id)
+        delay = min(
+            RETRY_DELAY * 2**self.__retry_count, CONFIG.conf.update_interval * 60
+        )
+        self.__retry_count += 1
+        logger.debug(f"Retrying update check in {delay} s")
+        self.__update_timer_id = GObject.timeout_add_seconds(delay, self.__on_retry)
+
+    def __on_retry(self):
+        self.__update_timer_id = -1
+        self.__get_updates()
+        return False
+
+    def schedule_daemon_exit(self):
+        """
+        keep the daemon running for daemon_keepalive minutes after a check or
+        after yumex is closed, so yumex or the next check don't have to start
+        it again
+        """
+        keepalive = CONFIG.conf.daemon_keepalive
+        if keepalive > 0:
+            if self.__exit_timer_id != -1:
+                GObject.source_remove(self.__exit_timer_id)
+            self.__exit_timer_id = GObject.timeout_add_seconds(
+                keepalive * 60, self.__on_exit_timeout
+            )
+
+    def __on_exit_timeout(self):
+        self.__exit_timer_id = -1
+        logger.debug("daemon keep-alive time is over")
+        self.close_daemon()
+        return False
+
+    def close_daemon(self):
+        """close the daemon, if it is running and no one else (yumex) is
+        using it
+        """
+        if self.__exit_timer_id != -1:
+            GObject.source_remove(self.__exit_timer_id)
+            self.__exit_timer_id = -1
+        # the daemon is D-Bus activated, so calling it will start it again
+        if not self.__is_daemon_running():
+            logger.debug("daemon is not running")
+            return
+        try:
+            if self.__backend.Lock():
+                logger.debug("closing the daemon")
+                self.__backend.Unlock()
+                self.__backend.Exit()
+            else:
+                logger.debug("daemon is in use, it is kept running")
+        except dnfdaemon.client.DaemonError as err:
+            logger.debug(f"Could not close the daemon : {err}")
+
+    @staticmethod
+    def __is_daemon_running():
+        try:
+            bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+            result = bus.call_sync(
+                "org.freedesktop.DBus",
+                "/org/freedesktop/DBus",
+                "org.freedesktop.DBus",
+                "NameHasOwner",
+                GLib.Variant("(s)", (DNFDAEMON_BUS_NAME,)),
+                GLib.VariantType("(b)"),
+                Gio.DBusCallFlags.NONE,
+                -1,
+                None,
+            )
+        except GLib.Error as err:
+            logger.debug(f"Could not check if the daemon is running : {err}")
+            return False
+        return result.unpack()[0]
 
     def __on_notify_action(self, notification, action):
         """Handle notification actions."""
@@ -198,7 +790,62 @@ class _Updater:
     def startup_init_update_timer(self):
         """start the update timer with a delayed startup."""
         logger.debug("Starting delayed update timer")
-        GObject.timeout_add_seconds(DELAYED_START, self.start_update_timer)
+        # don't let all machines check at the same time after login
+        delay = DELAYED_START + random.randint(0, DELAYED_START)
+        GObject.timeout_add_seconds(delay, self.start_update_timer)
+
+    def start_monitors(self):
+        """
+        watch the rpmdb and the dnf metadata cache, so the updates are checked
+        when packages are changed by others or the metadata is refreshed.
+        """
+        for path in RPMDB_DIRS + (DNF_CACHE_DIR,):
+            if not os.path.isdir(path):
+                continue
+            try:
+                monitor = Gio.File.new_for_path(path).monitor_directory(
+                    Gio.FileMonitorFlags.NONE, None
+                )
+            except GLib.Error as error:
+                logger.debug(f"Could not monitor {path} : {error}")
+                continue
+            monitor.connect("changed", self.__on_monitor_changed)
+            self.__monitors.append(monitor)
+            logger.debug(f"Monitoring {path} for changes")
+        # the update timer don't run while suspended, so restart it on resume
+        try:
+            bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+            bus.signal_subscribe(
+                "org.freedesktop.login1",
+                "org.freedesktop.login1.Manager",
+                "PrepareForSleep",
+                "/org/freedesktop/login1",
+                None,
+                Gio.DBusSignalFlags.NONE,
+                self.__on_prepare_for_sleep,
+            )
+        except GLib.Error as error:
+            logger.debug(f"Could not watch for resume : {error}")
+
+    def __on_monitor_changed(self, monitor, file, other_file, event_type):
+        # wait for things to settle down (a transaction changes many files)
+        if self.__monitor_timer_id == -1:
+            self.__monitor_timer_id = GObject.timeout_add_seconds(
+                MONITOR_DELAY, self.__on_monitor_timeout
+            )
+
+    def __on_monitor_timeout(self):
+        self.__monitor_timer_id = -1
+        # don't check before the first (delayed) check is done
+        if self.__markers is not None and get_markers() != self.__markers:
+            logger.debug("rpmdb or dnf cache has changed")
+            self.__get_updates()
+        return False
+
+    def __on_prepare_for_sleep(self, conn, sender, path, iface, signal, params):
+        if not params.unpack()[0]:
+            logger.debug("Resumed from suspend : restarting update timer")
+            self.start_update_timer()
 
     def start_update_timer(self):
         """
@@ -216,30 +863,27 @@ class _Updater:
         logger.debug(
             f"Starting update timer with a delay of {delay} min (time_diff={time_diff})"
         )
-        self.__next_update = delay
-        self.__last_timestamp = int(time.time())
-        self.__update_timer_id = GObject.timeout_add_seconds(1, self.__update_timeout)
+        # a single timer for the next check, with a random jitter, so the
+        # checks on many machines are spread out
+        jitter = random.randint(
+            0, min(UPDATE_JITTER, CONFIG.conf.update_interval * 60 // 10)
+        )
+        self.__update_timer_id = GObject.timeout_add_seconds(
+            max(delay * 60, 1) + jitter, self.__update_timeout
+        )
         return False
 
     def __update_timeout(self):
-        self.__next_update = self.__next_update - 1
         self.__update_timer_id = -1
-        if self.__next_update < 0:
+        time_diff = self.__update_timestamp.get_last_time_diff()
+        if time_diff == -1 or int(time_diff / 60) >= CONFIG.conf.update_interval:
             # check for updates: this will automatically restart the
             # timer
             self.__get_updates()
         else:
-            cur_timestamp = int(time.time())
-            if cur_timestamp - self.__last_timestamp > 60 * 2:
-                # this can happen on hibernation/suspend
-                # or when the system time changes
-                logger.debug("Time changed: restarting update timer")
-                self.start_update_timer()
-            else:
-                self.__update_timer_id = GObject.timeout_add_seconds(
-                    60, self.__update_timeout
-                )
-            self.__last_timestamp = cur_timestamp
+            # the system time has changed
+            logger.debug("Time changed: restarting update timer")
+            self.start_update_timer()
         return False
 
 
@@ -249,12 +893,16 @@ class UpdateApplication(Gio.Application):
     def __init__(self):
         Gio.Application.__init__(
             self,
-            application_id="dk.yumex.yumex-updater",
+            application_id=common.UPDATER_APP_ID,
             flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE,
         )
 
         self.connect("activate", self.__on_activate)
         self.connect("command-line", UpdateApplication.__on_command_line)
+        # activated by yumex, when it is closed (see daemon_keepalive)
+        action = Gio.SimpleAction.new("daemon-released", None)
+        action.connect("activate", self.__on_daemon_released)
+        self.add_action(action)
         self.__updater = None
         self.__main_loop = GLib.MainLoop.new(GLib.MainContext.default(), False)
 
@@ -288,7 +936,9 @@ class UpdateApplication(Gio.Application):
 
     def __on_activate(self, app):
         logger.debug("UpdateApplication activated")
+        self.__log_resources()
         self.__updater = _Updater()
+        self.__updater.start_monitors()
         if not self.__delay:
             self.__updater.startup_init_update_timer()
         else:
@@ -298,13 +948,33 @@ class UpdateApplication(Gio.Application):
             GLib.unix_signal_add_full(GLib.PRIORITY_HIGH, signal, self.__on_unix_signal)
         self.__main_loop.run()
 
+    @staticmethod
+    def __log_resources():
+        """log the resources used to start the updater"""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_time = usage.ru_utime + usage.ru_stime
+        gtk_loaded = "gi.repository.Gtk" in sys.modules
+        logger.debug(
+            f"Startup : cpu time = {cpu_time:.2f} s, max rss = "
+            f"{usage.ru_maxrss // 1024} MB, Gtk loaded = {gtk_loaded}"
+        )
+
+    def __on_daemon_released(self, action, param):
+        if self.__updater is not None:
+            logger.debug("yumex has released the daemon")
+            self.__updater.schedule_daemon_exit()
+
     def __on_unix_signal(self):
         self.__cleanup_and_quit()
         return GLib.SOURCE_REMOVE
 
     def __cleanup_and_quit(self):
         # all of UpdateApplication is running in main loop, so this is easy
-        common.dbus_dnfsystem("Exit")
+        if CONFIG.conf.daemon_keepalive == 0:
+            common.dbus_dnfsystem("Exit")
+        elif self.__updater is not None:
+            # no one is going to close the daemon, when we are gone
+            self.__updater.close_daemon()
         self.__main_loop.quit()
 
     def __log_setup(self):
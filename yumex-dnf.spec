@@ -18,6 +18,7 @@ BuildRequires: python3-devel >= 3.8
 BuildRequires: meson
 BuildRequires: python3-libsass
 BuildRequires: libappstream-glib
+BuildRequires: systemd-rpm-macros
 
 Requires: python3-dnfdaemon >= 0.3.10
 Requires: python3-gobject >= 3.10
@@ -45,6 +46,7 @@ Graphical package tool for maintain packages on the system
 %find_lang %name
 
 %post
+%tmpfiles_create %{name}.conf
 /bin/touch --no-create %{_datadir}/icons/hicolor &>/dev/null || :
 update-desktop-database %{_datadir}/applications &> /dev/null || :
 
@@ -66,6 +68,7 @@ update-desktop-database %{_datadir}/applications &> /dev/null || :
 %{_datadir}/applications/*.desktop
 %{_datadir}/icons/hicolor/
 %{_metainfodir}/%{name}.metainfo.xml
+%{_tmpfilesdir}/%{name}.conf
 
 %changelog
 